@@ -0,0 +1,90 @@
+"""Import time of the application, and a guard against heavy imports creeping back in.
+
+Imports every flaskr module and creates the app in a fresh interpreter with
+`python -X importtime`, and prints the slowest imports it pulls in. Exits with status 1 when the total
+exceeds the budget or when one of LAZY_MODULES (loaded on first use by the
+resume analysis, extraction and SMS paths) is imported at startup, so it can
+run as a CI step. No database is needed.
+
+Usage: python benchmarks/bench_import_time.py [budget_ms]   (default: 800)
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 800
+# Best of several runs, so one slow run on a busy machine does not fail the check
+RUNS = 3
+TOP = 10
+
+# Libraries that must only be imported when they are first needed
+LAZY_MODULES = ('google.generativeai', 'PyPDF2', 'docx', 'PIL', 'pytesseract', 'twilio', 'pptx')
+
+# Startup makes no database calls, so an unreachable URI is fine here
+IMPORT_APP = '''
+import pkgutil, flaskr
+for module in pkgutil.iter_modules(flaskr.__path__, 'flaskr.'):
+    __import__(module.name)
+flaskr.create_app({'TESTING': True, 'MONGO_URI': 'mongodb://localhost:27017/import_time'})
+'''
+
+
+def import_times(code=IMPORT_APP):
+    """Run code in a fresh interpreter; return {module: (cumulative microseconds, depth, parent)}."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    # Modules are listed after everything they import, so children wait here for their parent
+    pending = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        for child in pending.pop(depth + 1, []):
+            times[child] = times[child][:2] + (name,)
+        pending.setdefault(depth, []).append(name)
+        times[name] = (int(cumulative), depth, None)
+    return times
+
+
+def is_app_module(name):
+    return bool(name) and name.split('.')[0] == 'flaskr'
+
+
+def app_total(times):
+    """Microseconds spent importing flaskr, leaving out interpreter startup."""
+    return sum(us for name, (us, depth, _) in times.items() if depth == 0 and is_app_module(name))
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    runs = [import_times() for _ in range(RUNS)]
+    times = min(runs, key=app_total)
+    total_ms = app_total(times) / 1000.0
+    # The slowest libraries imported directly by flaskr modules
+    slowest = sorted(((us, name) for name, (us, _, parent) in times.items()
+                      if is_app_module(parent) and not is_app_module(name)), reverse=True)
+
+    print(f'{"module":<40} {"cumulative":>12}')
+    for us, name in slowest[:TOP]:
+        print(f'{name:<40} {us / 1000.0:10.1f}ms')
+    print(f'{"total":<40} {total_ms:10.1f}ms  (budget {budget_ms:.0f}ms)')
+
+    eager = [lazy for lazy in LAZY_MODULES
+             if any(name == lazy or name.startswith(lazy + '.') for name in times)]
+    failed = False
+    if eager:
+        print(f'FAIL: imported at startup but should be lazy: {", ".join(eager)}')
+        failed = True
+    if total_ms > budget_ms:
+        print(f'FAIL: import time {total_ms:.1f}ms is over the {budget_ms:.0f}ms budget')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Per-page latency of /applications/interviews for recruiters with many interviews."""
+import datetime
+
+from bson.objectid import ObjectId
+
+from common import bench_db, drop_bench_db, login, make_app, print_row, time_calls
+
+INTERVIEW_COUNTS = [100, 1000, 5000]
+
+
+def seed(db, interview_count):
+    now = datetime.datetime.now()
+    recruiter_id = db['recruiters'].insert_one({
+        'username': f'bench-recruiter-{ObjectId()}',
+        'email': f'{ObjectId()}@bench.example',
+        'profile_complete': True,
+        'created_at': now,
+    }).inserted_id
+
+    job_ids = db['jobs'].insert_many([
+        {'title': f'Job {i}', 'company_name': 'Bench Corp', 'recruiter_id': recruiter_id, 'created_at': now}
+        for i in range(max(interview_count // 50, 1))
+    ]).inserted_ids
+
+    student_ids = db['students'].insert_many([
+        {'username': f'bench-student-{ObjectId()}', 'email': f'{ObjectId()}@bench.example',
+         'full_name': f'Student {i}', 'created_at': now}
+        for i in range(interview_count)
+    ]).inserted_ids
+
+    application_ids = db['applications'].insert_many([
+        {'job_id': job_ids[i % len(job_ids)], 'student_id': student_id,
+         'student_name': f'Student {i}', 'status': 'Selected', 'created_at': now}
+        for i, student_id in enumerate(student_ids)
+    ]).inserted_ids
+
+    db['interviews'].insert_many([
+        {'application_id': application_id, 'job_id': job_ids[i % len(job_ids)],
+         'student_id': student_ids[i], 'recruiter_id': recruiter_id,
+         'interview_datetime': now + datetime.timedelta(minutes=i),
+         'interview_type': 'Technical', 'interview_location': 'Online', 'status': 'Scheduled'}
+        for i, application_id in enumerate(application_ids)
+    ])
+    return recruiter_id
+
+
+def main():
+    app = make_app()
+    try:
+        for count in INTERVIEW_COUNTS:
+            recruiter_id = seed(bench_db(app), count)
+            client = app.test_client()
+            login(client, recruiter_id, 'recruiter')
+
+            response = client.get('/applications/interviews')
+            assert response.status_code == 200, response.status_code
+            server_timing = ', '.join(response.headers.getlist('Server-Timing'))
+
+            timings = time_calls(lambda: client.get('/applications/interviews'), repeat=10)
+            print_row(f'interviews n={count}', timings, server_timing)
+    finally:
+        drop_bench_db(app)
+
+
+if __name__ == '__main__':
+    main()
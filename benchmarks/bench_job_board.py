@@ -0,0 +1,68 @@
+"""Time the eligible-only job board query and check that it is served by an index.
+
+Prints the stages of the winning plan and exits with status 1 when it scans
+the whole collection, e.g. after a change to jobs.eligibility_query.
+
+Usage: python benchmarks/bench_job_board.py [size]   (default: 100000)
+"""
+import datetime
+import random
+import sys
+
+from common import bench_db, drop_bench_db, make_app, print_row, time_calls
+from flaskr.jobs import JOB_LIST_PROJECTION, JOBS_PER_PAGE, eligibility_query
+
+DEFAULT_SIZE = 100_000
+BATCH_SIZE = 10_000
+
+BRANCHES = ['Computer Science', 'Electronics', 'Mechanical', 'Civil', 'Electrical']
+
+
+def seed(db, size):
+    rng = random.Random(size)
+    now = datetime.datetime.now()
+    for offset in range(0, size, BATCH_SIZE):
+        db['jobs'].insert_many([{
+            'title': 'Engineer',
+            'company_name': 'Acme',
+            'min_cgpa': round(rng.uniform(5, 9), 1),
+            # Some jobs are open to every branch
+            'eligible_branches': rng.sample(BRANCHES, rng.randint(0, 2)),
+            'created_at': now - datetime.timedelta(minutes=i),
+        } for i in range(offset, min(offset + BATCH_SIZE, size))], ordered=False)
+
+
+def plan_stages(plan):
+    """Every stage name in a query plan tree."""
+    stages = [plan.get('stage')]
+    for key in ('inputStage', 'inputStages'):
+        children = plan.get(key) or []
+        for child in children if isinstance(children, list) else [children]:
+            stages.extend(plan_stages(child))
+    return stages
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    app = make_app()
+    try:
+        db = bench_db(app)
+        seed(db, size)
+        student = {'branch': 'Electronics', 'cgpa': 7.5}
+        query = eligibility_query(student)
+        cursor = lambda: (db['jobs'].find(query, JOB_LIST_PROJECTION)
+                          .sort([('created_at', -1), ('_id', -1)]).limit(JOBS_PER_PAGE + 1))
+
+        print(f'--- {size} jobs ---')
+        print_row('eligible-only first page', time_calls(lambda: list(cursor()), repeat=10))
+        stages = plan_stages(cursor().explain()['queryPlanner']['winningPlan'])
+        print(f'winning plan: {" <- ".join(stage for stage in stages if stage)}')
+        if 'COLLSCAN' in stages:
+            print('FAIL: the eligible-only query scans the whole jobs collection')
+            sys.exit(1)
+    finally:
+        drop_bench_db(app)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Measure OCR time and accuracy on phone-photo sized resumes, with and without preprocessing.
+
+Renders a known resume text onto a 12MP "photo" (tinted paper, slightly
+rotated), then OCRs it raw and after preprocess_for_ocr. Accuracy is the
+similarity of the OCR output to the rendered text. Requires the tesseract
+binary; without it only preprocessing time and the detected skew are shown.
+
+Usage: python benchmarks/bench_ocr.py [skew_degrees ...]   (default: 0 2.5)
+"""
+import difflib
+import shutil
+import sys
+import time
+
+import pytesseract
+from PIL import Image, ImageDraw, ImageFont
+
+from common import print_row, time_calls
+from flaskr.extraction import OCR_DEFAULTS, preprocess_for_ocr
+
+DEFAULT_SKEWS = [0.0, 2.5]
+PHOTO_SIZE = (3024, 4032)  # 12MP portrait phone photo
+
+RESUME_LINES = [
+    'Jane Doe - Software Engineer',
+    'Experience: Built Flask services backed by MongoDB',
+    'Skills: Python, SQL, Docker, Kubernetes, React',
+    'Education: B.E. Computer Science, CGPA 8.7',
+    'Projects: Campus placement portal, resume analyzer',
+] * 6
+
+
+def load_font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        return ImageFont.truetype('DejaVuSans.ttf', size)
+
+
+def render_photo(skew):
+    page = Image.new('RGB', PHOTO_SIZE, (236, 230, 214))
+    draw = ImageDraw.Draw(page)
+    font = load_font(72)
+    for number, line in enumerate(RESUME_LINES):
+        draw.text((200, 200 + number * 120), line, fill=(40, 40, 60), font=font)
+    return page.rotate(skew, resample=Image.BICUBIC, fillcolor=(236, 230, 214))
+
+
+def accuracy(text):
+    expected = ' '.join(RESUME_LINES).split()
+    return difflib.SequenceMatcher(None, expected, text.split()).ratio()
+
+
+def main():
+    skews = [float(arg) for arg in sys.argv[1:]] or DEFAULT_SKEWS
+    has_tesseract = shutil.which('tesseract') is not None
+    if not has_tesseract:
+        print('tesseract not found; showing preprocessing only')
+
+    for skew in skews:
+        photo = render_photo(skew)
+        print(f'\n{PHOTO_SIZE[0]}x{PHOTO_SIZE[1]} photo rotated {skew} degrees')
+
+        timings = time_calls(lambda: preprocess_for_ocr(photo.copy(), **OCR_DEFAULTS), repeat=5, warmup=1)
+        prepared = preprocess_for_ocr(photo.copy(), **OCR_DEFAULTS)
+        print_row('preprocess', timings, f'output {prepared.size[0]}x{prepared.size[1]}')
+
+        if not has_tesseract:
+            continue
+        for label, image in (('ocr raw', photo), ('ocr preprocessed', prepared)):
+            start = time.perf_counter()
+            text = pytesseract.image_to_string(image)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            print(f'{label:<32} {elapsed:10.0f}ms  accuracy={accuracy(text):.2%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Compare whole-document PDF extraction with the streaming, budgeted extractor.
+
+Generates multi-page resumes (text pages plus scanned, image-only pages) in a
+temporary directory; no database is needed.
+
+Usage: python benchmarks/bench_pdf_extraction.py [pages ...]   (default: 2 10 50)
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import PyPDF2
+
+from common import print_row, time_calls
+from flaskr.extraction import extract_pdf
+
+DEFAULT_PAGES = [2, 10, 50]
+MAX_CHARS = 24000
+LINES_PER_PAGE = 45
+# Every fourth page is a scan with no text layer
+SCANNED_EVERY = 4
+
+LINE = 'Built and maintained Flask services backed by MongoDB, with Python tooling and CI pipelines.'
+
+
+def _pdf_objects(pages):
+    """Objects for a PDF with the given page kinds ('text' or 'scan')."""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None,
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+               '<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray '
+               '/BitsPerComponent 8 /Length 1 >>\nstream\n\x80\nendstream']
+    kids = []
+    for number, kind in enumerate(pages):
+        if kind == 'text':
+            body = ''.join(f'({LINE} {number}.{line}) Tj T* ' for line in range(LINES_PER_PAGE))
+            content = f'BT /F1 9 Tf 12 TL 40 780 Td {body}ET'
+            resources = '<< /Font << /F1 3 0 R >> >>'
+        else:
+            content = 'q 612 0 0 792 0 0 cm /Im1 Do Q'
+            resources = '<< /XObject << /Im1 4 0 R >> >>'
+        objects.append(f'<< /Length {len(content)} >>\nstream\n{content}\nendstream')
+        content_ref = len(objects)
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources {resources} /Contents {content_ref} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'
+    return objects
+
+
+def write_resume(path, page_count):
+    pages = ['scan' if (number + 1) % SCANNED_EVERY == 0 else 'text' for number in range(page_count)]
+    output = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(_pdf_objects(pages), start=1):
+        offsets.append(len(output))
+        output += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(output)
+    output += f'xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    output += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode('latin-1')
+    output += f'trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+def extract_all_pages(path):
+    """The previous extractor: every page's text, joined."""
+    with open(path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return "\n".join(page.extract_text() for page in pdf_reader.pages)
+
+
+def peak_kib(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    page_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_PAGES
+    with tempfile.TemporaryDirectory() as tmp:
+        for page_count in page_counts:
+            path = os.path.join(tmp, f'resume_{page_count}.pdf')
+            write_resume(path, page_count)
+
+            variants = [
+                ('all pages', lambda: extract_all_pages(path)),
+                ('streaming, no budget', lambda: extract_pdf(path)),
+                (f'streaming, {MAX_CHARS} chars', lambda: extract_pdf(path, MAX_CHARS)),
+            ]
+            print(f'\n{page_count} pages')
+            for label, func in variants:
+                timings = time_calls(func, repeat=10)
+                print_row(label, timings, f'peak {peak_kib(func):.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Latency of serving the profile photos on a photo-heavy page, with and without the user lookup.
+
+Each "page" requests PHOTOS_PER_PAGE photos as a logged-in recruiter, as the
+job applications list does. The lookup variants clear the public_endpoint
+flag on profile.profile_photo to show what every request used to cost.
+"""
+import os
+import uuid
+
+from bson.objectid import ObjectId
+
+from common import bench_db, drop_bench_db, login, make_app, print_row, time_calls
+from flaskr.profile import PROFILE_PHOTOS_FOLDER
+
+PHOTOS_PER_PAGE = 50
+PHOTO_BYTES = 20 * 1024
+
+
+def write_photos():
+    os.makedirs(PROFILE_PHOTOS_FOLDER, exist_ok=True)
+    filenames = [f'bench-{uuid.uuid4().hex}.jpg' for _ in range(PHOTOS_PER_PAGE)]
+    for filename in filenames:
+        with open(os.path.join(PROFILE_PHOTOS_FOLDER, filename), 'wb') as f:
+            f.write(os.urandom(PHOTO_BYTES))
+    return filenames
+
+
+def main():
+    app = make_app()
+    filenames = write_photos()
+    try:
+        recruiter_id = bench_db(app)['recruiters'].insert_one({
+            'username': f'bench-recruiter-{ObjectId()}',
+            'email': f'{ObjectId()}@bench.example',
+            'profile_complete': True,
+        }).inserted_id
+        client = app.test_client()
+        login(client, recruiter_id, 'recruiter')
+        view = app.view_functions['profile.profile_photo']
+
+        def load_page():
+            for filename in filenames:
+                response = client.get(f'/profile/profile-photo/{filename}')
+                assert response.status_code == 200, response.status_code
+                response.close()
+
+        variants = [
+            ('user lookup, uncached', False, 0),
+            ('user lookup, cached', False, 30),
+            ('lookup skipped', True, 30),
+        ]
+        for label, public, user_cache_ttl in variants:
+            view.public_endpoint = public
+            app.config['USER_CACHE_TTL'] = user_cache_ttl
+            timings = time_calls(load_page, repeat=10)
+            print_row(label, timings, f'{PHOTOS_PER_PAGE} photos per page')
+        view.public_endpoint = True
+    finally:
+        for filename in filenames:
+            os.remove(os.path.join(PROFILE_PHOTOS_FOLDER, filename))
+        drop_bench_db(app)
+
+
+if __name__ == '__main__':
+    main()
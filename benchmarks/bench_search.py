@@ -0,0 +1,71 @@
+"""Compare the old unanchored $regex job filters against the job_search text index.
+
+Usage: python benchmarks/bench_search.py [size ...]   (default: 10000 100000 1000000)
+"""
+import datetime
+import random
+import sys
+
+from common import bench_db, drop_bench_db, make_app, print_row, time_calls
+from flaskr.jobs import JOB_LIST_PROJECTION, JOB_SEARCH_LIMIT
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BATCH_SIZE = 10_000
+
+COMPANIES = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises', 'Tyrell']
+LOCATIONS = ['Bengaluru', 'Pune', 'Hyderabad', 'Chennai', 'Mumbai', 'Delhi', 'Gadag', 'Remote']
+TITLES = ['Software Engineer', 'Data Analyst', 'Python Developer', 'DevOps Engineer', 'QA Engineer', 'Product Intern']
+SKILLS = ['python', 'java', 'react', 'sql', 'kubernetes', 'flask', 'django', 'spark', 'aws', 'linux']
+
+
+def seed(db, start, stop):
+    rng = random.Random(start)
+    now = datetime.datetime.now()
+    for offset in range(start, stop, BATCH_SIZE):
+        db['jobs'].insert_many([{
+            'title': rng.choice(TITLES),
+            'description': ' '.join(rng.sample(SKILLS, 4)) + ' experience required',
+            'company_name': rng.choice(COMPANIES),
+            'location': rng.choice(LOCATIONS),
+            'job_type': 'Full-time',
+            'min_cgpa': round(rng.uniform(5, 9), 1),
+            'eligible_branches': ['Computer Science'],
+            'created_at': now - datetime.timedelta(minutes=i),
+        } for i in range(offset, min(offset + BATCH_SIZE, stop))], ordered=False)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    app = make_app()
+    try:
+        db = bench_db(app)
+        seeded = 0
+        for size in sorted(sizes):
+            seed(db, seeded, size)
+            seeded = size
+
+            def run(query, sort):
+                return list(db['jobs'].find(query, JOB_LIST_PROJECTION).sort(sort).limit(JOB_SEARCH_LIMIT))
+
+            # Every variant asks for jobs at Hooli AND in Pune. A bare
+            # "hooli pune" $text search would OR the words, so each is quoted.
+            queries = {
+                'regex company+location': {'company_name': {'$regex': 'hool', '$options': 'i'},
+                                           'location': {'$regex': 'pun', '$options': 'i'}},
+                'exact company+location': {'company_name': 'Hooli', 'location': 'Pune'},
+                '$text "hooli" "pune"': {'$text': {'$search': '"hooli" "pune"'}},
+            }
+            counts = {label: db['jobs'].count_documents(query) for label, query in queries.items()}
+            assert len(set(counts.values())) == 1, f'queries match different jobs: {counts}'
+
+            print(f'--- {size} jobs ({counts["exact company+location"]} matches) ---')
+            for label, query in queries.items():
+                sort = ([('score', {'$meta': 'textScore'}), ('created_at', -1)] if '$text' in query
+                        else [('created_at', -1)])
+                print_row(label, time_calls(lambda: run(query, sort), repeat=10))
+    finally:
+        drop_bench_db(app)
+
+
+if __name__ == '__main__':
+    main()
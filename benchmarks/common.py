@@ -0,0 +1,65 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a real MongoDB. Point BENCH_MONGO_URI at a scratch
+database (it is dropped when the benchmark finishes), e.g.
+
+    BENCH_MONGO_URI=mongodb://localhost:27017/careerbridge_bench python benchmarks/bench_interviews.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskr import create_app
+from flaskr.db import get_db
+from flaskr.schema import init_db
+
+
+def make_app(**config):
+    mongo_uri = os.environ.get('BENCH_MONGO_URI')
+    if not mongo_uri:
+        sys.exit('Set BENCH_MONGO_URI to a scratch MongoDB database to run benchmarks.')
+    app_config = {'TESTING': True, 'MONGO_URI': mongo_uri}
+    app_config.update(config)
+    app = create_app(app_config)
+    init_db(app)
+    return app
+
+
+def bench_db(app):
+    with app.app_context():
+        return get_db()
+
+
+def drop_bench_db(app):
+    db = bench_db(app)
+    db.client.drop_database(db.name)
+
+
+def login(client, user_id, user_type):
+    with client.session_transaction() as session:
+        session['user_id'] = str(user_id)
+        session['user_type'] = user_type
+
+
+def time_calls(func, repeat=20, warmup=2):
+    """Call func repeatedly and return latency percentiles in milliseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    return {
+        'p50': statistics.median(samples),
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'min': samples[0],
+    }
+
+
+def print_row(label, timings, extra=''):
+    print(f"{label:<32} p50={timings['p50']:8.2f}ms  p95={timings['p95']:8.2f}ms  min={timings['min']:8.2f}ms  {extra}")
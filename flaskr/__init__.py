@@ -20,6 +20,14 @@ def create_app(test_config=None):
         # load the test config if passed in
         app.config.from_mapping(test_config)
 
+    # Number of proxies in front of the app (1 on Vercel) whose X-Forwarded-For
+    # header is trusted for the client address. Off by default: without a
+    # proxy, clients could send the header and pick their own address.
+    app.config.setdefault('PROXY_FIX_X_FOR', int(os.getenv('PROXY_FIX_X_FOR', 0)))
+    if app.config['PROXY_FIX_X_FOR']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
     # ensure the instance folder exists
     try:
         os.makedirs(app.instance_path)
@@ -44,72 +52,20 @@ def create_app(test_config=None):
     from . import db
     db.init_app(app)
 
+    # Per-request query counting and slow-query logging
+    from . import profiler
+    profiler.init_app(app)
+
+    # Shared rate limiting of failed logins
+    from . import ratelimit
+    ratelimit.init_app(app)
+
     from . import auth
     app.register_blueprint(auth.bp)
 
-    # Initialize database indexes
-    auth.init_db_indexes(app)
-
     # Register admin blueprint
     from . import admin
     app.register_blueprint(admin.bp)
-
-
-    # Import datetime here to ensure it's available in this scope
-    import datetime
-    
-    # Create first admin user if none exists
-    with app.app_context():
-        database = db.get_db()
-        
-        # Check if any admin exists in either students or recruiters collection
-        student_admin = database['students'].find_one({'is_admin': True})
-        recruiter_admin = database['recruiters'].find_one({'is_admin': True})
-        
-        if not student_admin and not recruiter_admin:
-            # No admin exists, so promote the first user (student or recruiter) to admin
-            
-            # First check if there are any students
-            first_student = database['students'].find_one({}, sort=[('created_at', 1)])
-            
-            # Then check if there are any recruiters
-            first_recruiter = database['recruiters'].find_one({}, sort=[('created_at', 1)])
-            
-            # Determine which user was registered first (if both exist)
-            if first_student and first_recruiter:
-                # Compare creation timestamps to find the first registered user
-                if first_student.get('created_at', datetime.datetime.max) <= first_recruiter.get('created_at', datetime.datetime.max):
-                    # Student was first, promote them
-                    database['students'].update_one(
-                        {'_id': first_student['_id']},
-                        {'$set': {'is_admin': True}}
-                    )
-                    from flaskr.admin_log import log_admin_event
-                    log_admin_event('admin_creation', f'Student {first_student.get("email")} automatically promoted to admin as first user')
-                else:
-                    # Recruiter was first, promote them
-                    database['recruiters'].update_one(
-                        {'_id': first_recruiter['_id']},
-                        {'$set': {'is_admin': True}}
-                    )
-                    from flaskr.admin_log import log_admin_event
-                    log_admin_event('admin_creation', f'Recruiter {first_recruiter.get("email")} automatically promoted to admin as first user')
-            elif first_student:
-                # Only students exist, promote the first student
-                database['students'].update_one(
-                    {'_id': first_student['_id']},
-                    {'$set': {'is_admin': True}}
-                )
-                from flaskr.admin_log import log_admin_event
-                log_admin_event('admin_creation', f'Student {first_student.get("email")} automatically promoted to admin as first user')
-            elif first_recruiter:
-                # Only recruiters exist, promote the first recruiter
-                database['recruiters'].update_one(
-                    {'_id': first_recruiter['_id']},
-                    {'$set': {'is_admin': True}}
-                )
-                from flaskr.admin_log import log_admin_event
-                log_admin_event('admin_creation', f'Recruiter {first_recruiter.get("email")} automatically promoted to admin as first user')
     
     from . import profile
     app.register_blueprint(profile.bp)
@@ -122,4 +78,17 @@ def create_app(test_config=None):
     from . import applications
     app.register_blueprint(applications.bp)
 
+    # Background queues for slow work such as SMS delivery, resume ingestion and AI analysis
+    from . import tasks, notifications, extraction, ingestion, resume_analysis
+    tasks.init_app(app)
+    notifications.init_app(app)
+    extraction.init_app(app)
+    ingestion.init_app(app)
+    resume_analysis.init_app(app)
+
+    # Indexes and the first admin are set up by `flask init-db`, so starting
+    # the app makes no database round trips
+    from . import schema
+    schema.init_app(app)
+
     return app
@@ -7,8 +7,10 @@ from bson.objectid import ObjectId
 from datetime import datetime, timedelta
 import os
 from flaskr.db import get_db
-from flaskr.auth import login_required
+from flaskr.auth import invalidate_user, login_required
 from flaskr.admin_log import log_admin_event, get_log_path, get_user_activity_data
+from flaskr import profiler
+from flaskr.cache import get_cache_stats
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -259,6 +261,7 @@ def user_edit(user_type, id):
                 {'_id': ObjectId(id)},
                 {'$set': update_doc}
             )
+            invalidate_user(user_type, id)
             log_admin_event('admin_user_edit', f'Admin edited user {email}', 
                            user_email=g.user.get('email'), ip=request.remote_addr)
             flash('User updated successfully.', 'success')
@@ -296,6 +299,7 @@ def user_delete(user_type, id):
     
     try:
         db[collection].delete_one({'_id': ObjectId(id)})
+        invalidate_user(user_type, id)
         log_admin_event('admin_user_delete', f'Admin deleted {user_type} {user.get("email")}', 
                        user_email=g.user.get('email'), ip=request.remote_addr)
         flash(f'{user_type.capitalize()} user deleted successfully.', 'success')
@@ -361,6 +365,17 @@ def logs():
     
     return render_template('admin/logs.html', logs=parsed_logs[::-1])  # Reverse to show newest first
 
+@bp.route('/performance')
+@admin_required
+def performance():
+    """View per-endpoint database usage and recent slow queries."""
+    return render_template('admin/performance.html',
+                           endpoints=profiler.get_endpoint_summary(),
+                           recent_requests=profiler.get_recent_requests()[:50],
+                           slow_queries=profiler.get_slow_queries(),
+                           caches=get_cache_stats(),
+                           slow_query_ms=current_app.config['SLOW_QUERY_MS'])
+
 @bp.route('/make-admin/<user_type>/<id>', methods=('POST',))
 @admin_required
 def make_admin(user_type, id):
@@ -387,6 +402,7 @@ def make_admin(user_type, id):
             {'_id': ObjectId(id)},
             {'$set': {'is_admin': True}}
         )
+        invalidate_user(user_type, id)
         flash('User has been granted admin privileges.', 'success')
         log_admin_event('admin_make_admin', f'Admin granted admin privileges to {user_type} {user.get("email")}', 
                        user_email=g.user.get('email'), ip=request.remote_addr)
@@ -426,6 +442,7 @@ def revoke_admin(user_type, id):
             {'_id': ObjectId(id)},
             {'$set': {'is_admin': False}}
         )
+        invalidate_user(user_type, id)
         log_admin_event('admin_demotion', f'Admin privileges revoked from {user_type} {user.get("email")}', 
                        user_email=g.user.get('email'), ip=request.remote_addr)
         flash(f'Admin privileges revoked from {user.get("username")}.', 'success')
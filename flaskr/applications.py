@@ -1,27 +1,56 @@
 import functools
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, session, url_for, jsonify
+    Blueprint, flash, g, redirect, render_template, request, session, url_for, jsonify, current_app,
+    Response, stream_with_context
 )
+from markupsafe import Markup
 from werkzeug.exceptions import abort
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 import datetime
-import os
-import tempfile
-import google.generativeai as genai
-from pptx import Presentation
-import PyPDF2
-import docx
-from PIL import Image
-import pytesseract
+import json
+import time
 
 from flaskr.db import get_db
 from flaskr.auth import login_required, recruiter_required, student_required
 from flaskr.jobs import get_job
-from flaskr.notifications import notify_student_shortlisted, notify_student_selected, notify_student_interview_scheduled, notify_student_interview_result
-from flaskr.profile import RESUME_FOLDER
+from flaskr.notifications import notify_student_shortlisted, notify_student_selected, notify_student_interview_scheduled, notify_student_interview_result, send_sms_batch, STATUS_SMS_MESSAGES
+from flaskr.resume_analysis import RESUME_ANALYSIS_QUEUE, RESUME_BATCH_QUEUE, resume_cache_key
+from flaskr.summary_cache import get_summary
+from flaskr.summary_prompt import sanitize_summary_html
+from flaskr.tasks import DONE, FAILED, QueueFull, get_queue
 
 bp = Blueprint('applications', __name__, url_prefix='/applications')
 
+# Number of applications shown per page on the job applications view
+APPLICATIONS_PER_PAGE = 50
+
+# Statuses a recruiter can set directly, one application or many at once
+APPLICATION_STATUSES = ('Applied', 'Shortlisted', 'Selected', 'Rejected')
+
+# Most applications a single bulk status update may change; the SMS queue
+# (SMS_QUEUE_SIZE) must be able to take this many messages at once
+BULK_STATUS_LIMIT = 1000
+
+# How often a batch progress stream checks the task, and for how long at most.
+# Streams are kept short so they fit serverless request limits and never tie
+# up a worker for long; the page then polls analyze_all_status instead.
+BATCH_PROGRESS_INTERVAL = 1.0
+BATCH_PROGRESS_STREAM_SECONDS = 25
+
+# Fields loaded for the documents joined onto the interviews list
+INTERVIEW_JOB_FIELDS = {'title': 1, 'company_name': 1, 'location': 1, 'job_type': 1}
+INTERVIEW_APPLICATION_FIELDS = {'job_id': 1, 'student_id': 1, 'student_name': 1,
+                                'student_email': 1, 'status': 1}
+INTERVIEW_STUDENT_FIELDS = {'full_name': 1, 'email': 1, 'phone': 1, 'branch': 1, 'cgpa': 1}
+
+@bp.app_template_filter('summary_html')
+def summary_html(value):
+    """Render a stored AI summary section, keeping only its allowlisted markup."""
+    return Markup(sanitize_summary_html(value))
+
 @bp.route('/job/<job_id>')
 @recruiter_required
 def job_applications(job_id):
@@ -33,22 +62,43 @@ def job_applications(job_id):
         abort(403)
     
     db = get_db()
-    applications = list(db['applications'].find({'job_id': ObjectId(job_id)}).sort('created_at', -1))
+    per_page = current_app.config.get('APPLICATIONS_PER_PAGE', APPLICATIONS_PER_PAGE)
+    page = max(request.args.get('page', 1, type=int), 1)
+    
+    application_filter = {'job_id': ObjectId(job_id)}
+    total_applications = db['applications'].count_documents(application_filter)
+    total_pages = max((total_applications + per_page - 1) // per_page, 1)
+    page = min(page, total_pages)
+    
+    applications = list(
+        db['applications'].find(application_filter)
+        .sort([('created_at', -1), ('_id', -1)])
+        .skip((page - 1) * per_page)
+        .limit(per_page)
+    )
+    
+    # Fetch the resumes for every applicant on this page in one round trip
+    student_ids = list({app['student_id'] for app in applications if app.get('student_id')})
+    resume_urls = {}
+    if student_ids:
+        for student in db['students'].find({'_id': {'$in': student_ids}}, {'resume_url': 1}):
+            resume_urls[student['_id']] = student.get('resume_url')
     
     # Add file type information for each application's resume
     for app in applications:
-        if app.get('student_id'):
-            student = db['students'].find_one({'_id': app['student_id']})
-            if student and student.get('resume_url'):
-                # Determine file type based on extension
-                file_extension = student['resume_url'].rsplit('.', 1)[1].lower() if '.' in student['resume_url'] else ''
-                app['resume_file_type'] = file_extension
-            else:
-                app['resume_file_type'] = None
+        resume_url = resume_urls.get(app.get('student_id'))
+        if resume_url:
+            # Determine file type based on extension
+            app['resume_file_type'] = resume_url.rsplit('.', 1)[1].lower() if '.' in resume_url else ''
         else:
             app['resume_file_type'] = None
     
-    return render_template('applications/job_applications.html', job=job, applications=applications)
+    return render_template('applications/job_applications.html',
+                           job=job,
+                           applications=applications,
+                           total_applications=total_applications,
+                           page=page,
+                           total_pages=total_pages)
 
 @bp.route('/view/<application_id>')
 @recruiter_required
@@ -153,13 +203,13 @@ def update_status(application_id):
     )
     
     # Add a notification for the student
-    db['notifications'].insert_one({
+    notification_id = db['notifications'].insert_one({
         'user_id': application['student_id'],
-        'title': f'Application Status Updated',
+        'title': 'Application Status Updated',
         'message': f'Your application for {job["title"]} at {job["company_name"]} has been updated to: {new_status}',
         'read': False,
         'created_at': datetime.datetime.now()
-    })
+    }).inserted_id
     
     # Get the student for SMS notification
     student = db['students'].find_one({'_id': application['student_id']})
@@ -168,16 +218,16 @@ def update_status(application_id):
     sms_sent = False
     if new_status == 'Shortlisted' and student:
         # Send shortlisted notification
-        sms_sent = notify_student_shortlisted(student, job)
+        sms_sent = notify_student_shortlisted(student, job, notification_id)
         if sms_sent:
-            flash('Application status updated and SMS notification sent!', 'success')
+            flash('Application status updated and SMS notification queued!', 'success')
         else:
             flash('Application status updated, but SMS notification could not be sent.', 'warning')
     elif new_status == 'Selected' and student:
         # Send selected notification
-        sms_sent = notify_student_selected(student, job)
+        sms_sent = notify_student_selected(student, job, notification_id)
         if sms_sent:
-            flash('Application status updated and SMS notification sent!', 'success')
+            flash('Application status updated and SMS notification queued!', 'success')
         else:
             flash('Application status updated, but SMS notification could not be sent.', 'warning')
     else:
@@ -185,6 +235,116 @@ def update_status(application_id):
     
     return redirect(url_for('applications.job_applications', job_id=str(job['_id'])))
 
+@bp.route('/job/<job_id>/bulk-status', methods=('POST',))
+@recruiter_required
+def bulk_update_status(job_id):
+    """Set the status of many applications for a job at once, reporting the outcome of each."""
+    job = get_job(job_id)
+    if g.user['_id'] != job['recruiter_id']:
+        return jsonify({
+            'error': 'Unauthorized access'
+        }), 403
+    
+    data = request.get_json(silent=True) or request.form
+    if not isinstance(data, dict):
+        return jsonify({
+            'error': 'Expected a JSON object.'
+        }), 400
+    new_status = data.get('status')
+    application_ids = data.get('application_ids') if request.is_json else request.form.getlist('application_ids')
+    if new_status not in APPLICATION_STATUSES:
+        return jsonify({
+            'error': 'A valid status is required.'
+        }), 400
+    if not isinstance(application_ids, list) or not all(isinstance(application_id, str)
+                                                         for application_id in application_ids):
+        return jsonify({
+            'error': 'application_ids must be a list of application ids.'
+        }), 400
+    if not application_ids or len(application_ids) > BULK_STATUS_LIMIT:
+        return jsonify({
+            'error': f'Select between 1 and {BULK_STATUS_LIMIT} applications.'
+        }), 400
+    
+    db = get_db()
+    results = {application_id: {'application_id': application_id, 'ok': False}
+               for application_id in application_ids}
+    
+    object_ids = {}
+    for application_id in results:
+        try:
+            object_ids[ObjectId(application_id)] = application_id
+        except (InvalidId, TypeError):
+            results[application_id]['error'] = 'Invalid application id'
+    
+    # Only applications to this job can be changed
+    applications = list(db['applications'].find(
+        {'_id': {'$in': list(object_ids)}, 'job_id': job['_id']},
+        {'student_id': 1}
+    ))
+    for object_id, application_id in object_ids.items():
+        results[application_id].setdefault('error', 'Application not found')
+    
+    now = datetime.datetime.now()
+    update = {'$set': {
+        'status': new_status,
+        'status_updated_at': now,
+        'status_updated_by': g.user['_id']
+    }}
+    failed = set()
+    if applications:
+        try:
+            db['applications'].bulk_write(
+                [UpdateOne({'_id': application['_id']}, update) for application in applications],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                failed.add(applications[error['index']]['_id'])
+                results[object_ids[applications[error['index']]['_id']]]['error'] = error.get('errmsg', 'Update failed')
+    updated = [application for application in applications if application['_id'] not in failed]
+    for application in updated:
+        result = results[object_ids[application['_id']]]
+        result.pop('error', None)
+        result['ok'] = True
+    
+    if updated:
+        # One notification per updated application, written together
+        notification_ids = db['notifications'].insert_many([{
+            'user_id': application['student_id'],
+            'title': 'Application Status Updated',
+            'message': f'Your application for {job["title"]} at {job["company_name"]} has been updated to: {new_status}',
+            'read': False,
+            'created_at': now
+        } for application in updated]).inserted_ids
+        
+        # Students for the SMS, in one query, handed to the SMS queue as one batch
+        message_builder = STATUS_SMS_MESSAGES.get(new_status)
+        if message_builder:
+            phones = {student['_id']: student.get('phone') for student in db['students'].find(
+                {'_id': {'$in': list({application['student_id'] for application in updated})}},
+                {'phone': 1}
+            )}
+            messages, recipients = [], []
+            for application, notification_id in zip(updated, notification_ids):
+                result = results[object_ids[application['_id']]]
+                phone = phones.get(application['student_id'])
+                if not phone:
+                    result['sms'] = 'no_phone'
+                    continue
+                messages.append({'to': phone, 'message': message_builder(job), 'notification_id': notification_id})
+                recipients.append(result)
+            for result, sms_status in zip(recipients, send_sms_batch(messages)):
+                result['sms'] = sms_status
+    
+    items = [results[application_id] for application_id in results]
+    return jsonify({
+        'status': new_status,
+        'updated': sum(1 for item in items if item['ok']),
+        'failed': sum(1 for item in items if not item['ok']),
+        'results': items
+    })
+
 @bp.route('/<application_id>/schedule-interview', methods=('GET', 'POST'))
 @recruiter_required
 def schedule_interview(application_id):
@@ -253,13 +413,13 @@ def schedule_interview(application_id):
             )
             
             # Add a notification for the student
-            db['notifications'].insert_one({
+            notification_id = db['notifications'].insert_one({
                 'user_id': application['student_id'],
                 'title': f'Interview Scheduled',
                 'message': f'An interview has been scheduled for your application to {job["title"]} at {job["company_name"]}. Date: {interview_date}, Time: {interview_time}',
                 'read': False,
                 'created_at': datetime.datetime.now()
-            })
+            }).inserted_id
             
             # Send SMS notification if student has a phone number
             student = db['students'].find_one({'_id': application['student_id']})
@@ -268,7 +428,7 @@ def schedule_interview(application_id):
                     'interview_datetime': interview_datetime,
                     'interview_type': interview_type,
                     'interview_location': interview_location
-                })
+                }, notification_id)
             
             flash('Interview scheduled successfully!', 'success')
             return redirect(url_for('applications.job_applications', job_id=str(job['_id'])))
@@ -352,13 +512,13 @@ def create_interview(application_id):
             }).inserted_id
             
             # Add a notification for the student
-            db['notifications'].insert_one({
+            notification_id = db['notifications'].insert_one({
                 'user_id': application['student_id'],
                 'title': f'Interview Created',
                 'message': f'An interview has been created for your application to {job["title"]} at {job["company_name"]}. Date: {interview_date}, Time: {interview_time}',
                 'read': False,
                 'created_at': datetime.datetime.now()
-            })
+            }).inserted_id
             
             # Send SMS notification if student has a phone number
             student = db['students'].find_one({'_id': application['student_id']})
@@ -367,7 +527,7 @@ def create_interview(application_id):
                     'interview_datetime': interview_datetime,
                     'interview_type': interview_type,
                     'interview_location': interview_location
-                })
+                }, notification_id)
             
             flash('Interview created successfully!', 'success')
             return redirect(url_for('applications.view_application', application_id=application_id))
@@ -389,6 +549,13 @@ def create_interview(application_id):
                           job=job, 
                           interview_types=interview_types)
 
+def fetch_by_ids(collection, ids, projection=None):
+    """Load the documents with the given ids in one query, indexed by _id."""
+    ids = list({doc_id for doc_id in ids if doc_id is not None})
+    if not ids:
+        return {}
+    return {doc['_id']: doc for doc in collection.find({'_id': {'$in': ids}}, projection)}
+
 @bp.route('/interviews')
 @login_required
 def interviews():
@@ -402,39 +569,47 @@ def interviews():
         # Get all interviews created by the recruiter
         interviews = list(db['interviews'].find({'recruiter_id': g.user['_id']}).sort('interview_datetime', 1))
     
-    # Get job and application details for each interview
+    # Load the related jobs, applications and students with one query per collection
+    jobs = fetch_by_ids(db['jobs'], (i.get('job_id') for i in interviews), INTERVIEW_JOB_FIELDS)
+    applications = fetch_by_ids(db['applications'], (i.get('application_id') for i in interviews),
+                                INTERVIEW_APPLICATION_FIELDS)
+    students = {}
+    if g.user['user_type'] == 'recruiter':
+        students = fetch_by_ids(db['students'], (a.get('student_id') for a in applications.values()),
+                                INTERVIEW_STUDENT_FIELDS)
+    
+    # Attach job and application details to each interview
     for interview in interviews:
-        job = db['jobs'].find_one({'_id': interview['job_id']})
+        job = jobs.get(interview.get('job_id'))
         if job:
             interview['job'] = job
         
-        application = db['applications'].find_one({'_id': interview['application_id']})
+        application = applications.get(interview.get('application_id'))
         if application:
             interview['application'] = application
             
-            # If recruiter, get student details
-            if g.user['user_type'] == 'recruiter':
-                student = db['students'].find_one({'_id': application['student_id']})
-                if student:
-                    interview['student'] = student
+            # If recruiter, attach student details
+            student = students.get(application.get('student_id'))
+            if student:
+                interview['student'] = student
     
     # If recruiter, get all selected applications for the create interview modal
     selected_applications = []
     if g.user['user_type'] == 'recruiter':
-        # Get all jobs created by this recruiter
-        recruiter_jobs = list(db['jobs'].find({'recruiter_id': g.user['_id']}))
-        job_ids = [job['_id'] for job in recruiter_jobs]
+        # Get all jobs created by this recruiter, indexed by id
+        recruiter_jobs = {job['_id']: job for job in
+                          db['jobs'].find({'recruiter_id': g.user['_id']}, INTERVIEW_JOB_FIELDS)}
         
         # Get all selected applications for these jobs
-        if job_ids:
-            applications = list(db['applications'].find({
-                'job_id': {'$in': job_ids},
+        if recruiter_jobs:
+            applications = db['applications'].find({
+                'job_id': {'$in': list(recruiter_jobs)},
                 'status': 'Selected'
-            }))
+            }, INTERVIEW_APPLICATION_FIELDS)
             
             # Add job details to each application
             for application in applications:
-                job = next((j for j in recruiter_jobs if j['_id'] == application['job_id']), None)
+                job = recruiter_jobs.get(application['job_id'])
                 if job:
                     application['job'] = job
                     selected_applications.append(application)
@@ -503,13 +678,13 @@ def create_interview_from_list():
         }).inserted_id
         
         # Add a notification for the student
-        db['notifications'].insert_one({
+        notification_id = db['notifications'].insert_one({
             'user_id': application['student_id'],
             'title': f'Interview Created',
             'message': f'An interview has been created for your application to {job["title"]} at {job["company_name"]}. Date: {interview_date}, Time: {interview_time}',
             'read': False,
             'created_at': datetime.datetime.now()
-        })
+        }).inserted_id
         
         # Send SMS notification if student has a phone number
         student = db['students'].find_one({'_id': application['student_id']})
@@ -518,7 +693,7 @@ def create_interview_from_list():
                 'interview_datetime': interview_datetime,
                 'interview_type': interview_type,
                 'interview_location': interview_location
-            })
+            }, notification_id)
         
         flash('Interview created successfully!', 'success')
     else:
@@ -643,20 +818,20 @@ def update_interview_result(interview_id):
     )
     
     # Add a notification for the student
-    db['notifications'].insert_one({
+    notification_id = db['notifications'].insert_one({
         'user_id': application['student_id'],
         'title': f'Interview Result: {result}',
         'message': f'Your interview for {job["title"]} at {job["company_name"]} has been marked as {result}. {feedback}',
         'read': False,
         'created_at': datetime.datetime.now()
-    })
+    }).inserted_id
     
     # Send SMS notification if student has a phone number
     student = db['students'].find_one({'_id': application['student_id']})
     if student:
         notify_student_interview_result(student, job, {
             'result': result
-        })
+        }, notification_id)
         
         # If the student is selected, also send the selection notification
         if result == 'Pass':
@@ -683,169 +858,10 @@ def notifications():
     return render_template('applications/notifications.html', notifications=notifications)
 
 
-# Configure Google Gemini API
-# For production, use environment variables instead
-GEMINI_API_KEY = "your gemi api key here"  # Replace with your actual Gemini API key
-genai.configure(api_key=GEMINI_API_KEY)
-
-
-def extract_text_from_pdf(file_path):
-    """Extract text content from a PDF file"""
-    text_content = []
-    
-    try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            # Extract text from each page
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text_content.append(page.extract_text())
-        
-        return "\n".join(text_content)
-    except Exception as e:
-        print(f"Error extracting text from PDF: {str(e)}")
-        return ""
-
-
-def extract_text_from_docx(file_path):
-    """Extract text content from a Word document"""
-    try:
-        doc = docx.Document(file_path)
-        text_content = []
-        
-        # Extract text from paragraphs
-        for para in doc.paragraphs:
-            if para.text.strip():
-                text_content.append(para.text)
-        
-        # Extract text from tables
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = []
-                for cell in row.cells:
-                    if cell.text.strip():
-                        row_text.append(cell.text.strip())
-                if row_text:
-                    text_content.append(" | ".join(row_text))
-        
-        return "\n".join(text_content)
-    except Exception as e:
-        print(f"Error extracting text from DOCX: {str(e)}")
-        return ""
-
-
-def extract_text_from_image(file_path):
-    """Extract text content from an image using OCR"""
-    try:
-        # Open the image
-        image = Image.open(file_path)
-        
-        # Use pytesseract to extract text
-        text = pytesseract.image_to_string(image)
-        
-        return text
-    except Exception as e:
-        print(f"Error extracting text from image: {str(e)}")
-        return ""
-
-
-def generate_resume_summary(text, job_title=None, job_description=None):
-    """Generate a summary of the resume using Google Gemini API"""
-    if not text.strip():
-        return {
-            "candidate_summary": "<p>No text content could be extracted from the resume.</p>",
-            "key_skills": "<p>No skills could be identified.</p>",
-            "job_fit": "<p>Unable to analyze job fit due to missing resume content.</p>"
-        }
-    
-    try:
-        # Use Gemini model
-        model = genai.GenerativeModel("models/gemini-1.5-flash")
-        
-        # Create a prompt for resume analysis
-        job_context = ""
-        if job_title and job_description:
-            job_context = f"\nThe candidate has applied for the position of {job_title}. \nJob Description: {job_description}\n"
-        
-        prompt = f"""
-        You are an expert HR professional analyzing a resume. Please provide a comprehensive analysis of the following resume content.
-        Format your response in HTML with appropriate tags (<p>, <ul>, <li>, <strong>, etc.).
-        
-        Resume Content:
-        {text}
-        {job_context}
-        
-        Please provide the following sections:
-        1. Candidate Summary: A brief overview of the candidate's background, experience, and qualifications.
-        2. Key Skills: A bullet-point list of the candidate's key skills and competencies.
-        3. Job Fit Analysis: An assessment of how well the candidate's profile matches the job requirements.
-        
-        Return your response as a JSON object with the following structure:
-        {{
-            "candidate_summary": "HTML formatted candidate summary",
-            "key_skills": "HTML formatted list of key skills",
-            "job_fit": "HTML formatted job fit analysis"
-        }}
-        """
-        
-        # Generate the response
-        response = model.generate_content(prompt)
-        
-        # Try to parse the response as JSON
-        try:
-            import json
-            # Extract JSON from the response text
-            response_text = response.text
-            
-            # Find JSON content between curly braces
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = response_text[start_idx:end_idx]
-                result = json.loads(json_str)
-                return result
-            else:
-                # Fallback: create structured response manually
-                return {
-                    "candidate_summary": f"<p>{response.text}</p>",
-                    "key_skills": "<p>Skills extraction failed.</p>",
-                    "job_fit": "<p>Job fit analysis failed.</p>"
-                }
-        except Exception as json_error:
-            print(f"Error parsing JSON response: {str(json_error)}")
-            # Fallback: return the raw text
-            return {
-                "candidate_summary": f"<p>{response.text}</p>",
-                "key_skills": "<p>Skills extraction failed.</p>",
-                "job_fit": "<p>Job fit analysis failed.</p>"
-            }
-    
-    except Exception as e:
-        print(f"Error generating summary: {str(e)}")
-        # Try fallback to another model if the first one fails
-        try:
-            fallback_model = genai.GenerativeModel("models/gemini-1.5-pro")
-            response = fallback_model.generate_content(prompt)
-            return {
-                "candidate_summary": f"<p>{response.text}</p>",
-                "key_skills": "<p>Skills extraction failed.</p>",
-                "job_fit": "<p>Job fit analysis failed.</p>"
-            }
-        except Exception as fallback_e:
-            error_message = f"Error generating summary with primary model: {str(e)}\n\nError with fallback model: {str(fallback_e)}"
-            return {
-                "candidate_summary": f"<p>Error generating summary: {error_message}</p>",
-                "key_skills": "<p>Skills extraction failed.</p>",
-                "job_fit": "<p>Job fit analysis failed.</p>"
-            }
-
-
-@bp.route('/resume-summary/<application_id>')
+@bp.route('/resume-summary/<application_id>', methods=('POST',))
 @recruiter_required
 def resume_summary(application_id):
-    """Generate an AI summary of a student's resume"""
+    """Queue an AI summary of a student's resume and return the task id to poll"""
     db = get_db()
     
     # Get the application
@@ -856,7 +872,7 @@ def resume_summary(application_id):
         }), 404
     
     # Get the job
-    job = db['jobs'].find_one({'_id': application['job_id']})
+    job = db['jobs'].find_one({'_id': application['job_id']}, {'recruiter_id': 1})
     if job is None:
         return jsonify({
             'error': 'Job not found'
@@ -868,42 +884,136 @@ def resume_summary(application_id):
             'error': 'Unauthorized access'
         }), 403
     
-    # Get the student to determine resume file type and path
-    student = db['students'].find_one({'_id': application['student_id']})
+    # Make sure there is a resume to analyze before queueing any work
+    student = db['students'].find_one({'_id': application['student_id']}, {'resume_url': 1, 'resume_sha256': 1})
     if student is None or not student.get('resume_url'):
         return jsonify({
             'error': 'Resume not found'
         }), 404
     
-    # Get the resume file path
-    resume_path = os.path.join(RESUME_FOLDER, student['resume_url'])
+    # Answer straight from the summary cache unless a fresh summary was asked for
+    refresh = request.form.get('refresh') == '1'
+    if not refresh and student.get('resume_sha256'):
+        _, cache_key = resume_cache_key(student, job['_id'])
+        summary = get_summary(cache_key)
+        if summary is not None:
+            return jsonify({'status': 'done', 'summary': summary})
     
-    if not os.path.exists(resume_path):
+    try:
+        task_id = get_queue(RESUME_ANALYSIS_QUEUE).submit(
+            {'application_id': application_id, 'refresh': refresh},
+            owner_id=str(g.user['_id'])
+        )
+    except QueueFull:
         return jsonify({
-            'error': 'Resume file not found'
+            'error': 'Resume analysis is busy right now. Please try again shortly.'
+        }), 503
+    
+    return jsonify({
+        'task_id': task_id,
+        'status': 'queued',
+        'status_url': url_for('applications.resume_summary_status', task_id=task_id)
+    }), 202
+
+@bp.route('/resume-summary/tasks/<task_id>')
+@recruiter_required
+def resume_summary_status(task_id):
+    """Poll the state of a queued resume summary"""
+    task = get_queue(RESUME_ANALYSIS_QUEUE).get(task_id)
+    if task is None or task.get('owner_id') != str(g.user['_id']):
+        return jsonify({
+            'error': 'Task not found'
         }), 404
     
-    # Determine file type based on extension
-    file_extension = student['resume_url'].rsplit('.', 1)[1].lower() if '.' in student['resume_url'] else ''
-    
-    # Extract text based on file type
-    text_content = ""
-    if file_extension == 'pdf':
-        text_content = extract_text_from_pdf(resume_path)
-    elif file_extension in ['doc', 'docx']:
-        text_content = extract_text_from_docx(resume_path)
-    elif file_extension in ['jpg', 'jpeg']:
-        text_content = extract_text_from_image(resume_path)
-    else:
+    response = {'task_id': task_id, 'status': task['status']}
+    if task.get('result'):
+        response['summary'] = task['result']
+    if task.get('error'):
+        response['error'] = task['error']
+    return jsonify(response)
+
+@bp.route('/job/<job_id>/analyze-all', methods=['POST'])
+@recruiter_required
+def analyze_all(job_id):
+    """Queue AI summaries for every applicant of a job"""
+    job = get_job(job_id)
+    if g.user['_id'] != job['recruiter_id']:
         return jsonify({
-            'error': 'Unsupported file type'
-        }), 400
-    
-    # Generate summary using the extracted text
-    summary = generate_resume_summary(
-        text_content, 
-        job_title=job.get('title'), 
-        job_description=job.get('description')
-    )
+            'error': 'Unauthorized access'
+        }), 403
     
-    return jsonify(summary)
+    try:
+        task_id = get_queue(RESUME_BATCH_QUEUE).submit(
+            {'job_id': job_id, 'refresh': request.form.get('refresh') == '1'},
+            owner_id=str(g.user['_id'])
+        )
+    except QueueFull:
+        return jsonify({
+            'error': 'Resume analysis is busy right now. Please try again shortly.'
+        }), 503
+    
+    return jsonify({
+        'task_id': task_id,
+        'status': 'queued',
+        'events_url': url_for('applications.analyze_all_events', task_id=task_id),
+        'status_url': url_for('applications.analyze_all_status', task_id=task_id)
+    }), 202
+
+def _batch_progress(task):
+    """Progress of a batch analysis task as sent to the page; a missing task has failed."""
+    if task is None:
+        return {'status': FAILED, 'progress': {}, 'error': 'The analysis task has expired.'}
+    return {
+        'status': task['status'],
+        'progress': task.get('result') or task.get('progress') or {},
+        'error': task.get('error'),
+    }
+
+def _get_batch_task(task_id):
+    task = get_queue(RESUME_BATCH_QUEUE).get(task_id)
+    if task is None or task.get('owner_id') != str(g.user['_id']):
+        return None
+    return task
+
+@bp.route('/analyze-all/tasks/<task_id>')
+@recruiter_required
+def analyze_all_status(task_id):
+    """Poll the progress of a batch analysis"""
+    task = _get_batch_task(task_id)
+    if task is None:
+        return jsonify({
+            'error': 'Task not found'
+        }), 404
+    return jsonify(_batch_progress(task))
+
+@bp.route('/analyze-all/tasks/<task_id>/events')
+@recruiter_required
+def analyze_all_events(task_id):
+    """Stream the progress of a batch analysis as server-sent events.
+
+    The stream ends after BATCH_PROGRESS_STREAM_SECONDS with a 'poll' event,
+    telling the page to follow the rest through analyze_all_status.
+    """
+    if _get_batch_task(task_id) is None:
+        return jsonify({
+            'error': 'Task not found'
+        }), 404
+    task_queue = get_queue(RESUME_BATCH_QUEUE)
+    
+    def events():
+        deadline = time.monotonic() + BATCH_PROGRESS_STREAM_SECONDS
+        last_event = None
+        while time.monotonic() < deadline:
+            progress = _batch_progress(task_queue.get(task_id))
+            event = json.dumps(progress)
+            # Only send changes, keeping the connection quiet while a batch waits
+            if event != last_event:
+                yield f'data: {event}\n\n'
+                last_event = event
+            if progress['status'] in (DONE, FAILED):
+                return
+            time.sleep(BATCH_PROGRESS_INTERVAL)
+        yield 'event: poll\ndata: {}\n\n'
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -2,8 +2,9 @@ import functools
 from flask import (
     Blueprint, flash, g, redirect, render_template, request, session, url_for
 )
+import itertools
 import re
-import time
+import threading
 from datetime import datetime
 from flask import request as flask_request
 from flaskr.admin_log import log_admin_event
@@ -11,28 +12,28 @@ from werkzeug.security import check_password_hash, generate_password_hash
 from bson.objectid import ObjectId
 
 from flaskr.db import get_db
+from flaskr.cache import TTLCache
+from flaskr.ratelimit import get_login_limiter
 from pymongo.errors import DuplicateKeyError
 
 from flask import current_app
 
 bp = Blueprint('auth', __name__)
 
-def init_db_indexes(app):
-    """Initialize database indexes for optimal performance"""
-    with app.app_context():
-        db = get_db()
-        # Create indexes for students collection
-        db['students'].create_index([('email', 1)], unique=True)
-        db['students'].create_index([('username', 1)], unique=True)
-        db['students'].create_index([('phone', 1)], unique=True, sparse=True)
-        db['students'].create_index([('email', 1), ('password', 1)])
-        
-        # Create indexes for recruiters collection
-        db['recruiters'].create_index([('email', 1)], unique=True)
-        db['recruiters'].create_index([('username', 1)], unique=True)
-        db['recruiters'].create_index([('phone', 1)], unique=True, sparse=True)
-        db['recruiters'].create_index([('company_name', 1)])
-        db['recruiters'].create_index([('email', 1), ('password', 1)])
+# Fields never loaded into g.user: the password hash and the stored resume text
+USER_PROJECTION = {'password': 0, 'resume_text': 0, 'resume_extraction': 0}
+
+# Logged-in users are cached per process for USER_CACHE_TTL seconds. Edits made
+# in this process invalidate the entry at once; other workers pick them up
+# when their copy expires.
+USER_CACHE_TTL = 30
+_user_cache = TTLCache('users', maxsize=1024, ttl=USER_CACHE_TTL)
+
+# Version stamp per cached user, bumped by every invalidation so that a load
+# which raced with an edit never caches the document it read before the edit
+_user_versions = {}
+_version_counter = itertools.count(1)
+_versions_lock = threading.Lock()
 
 @bp.route('/')
 def index():
@@ -217,15 +218,23 @@ def recruiter_register():
 
 
 
-# Simple in-memory rate limiting (per session)
-LOGIN_ATTEMPT_LIMIT = 5
-LOGIN_ATTEMPT_WINDOW = 60  # seconds
+# Failed logins are limited per client IP and per email address through the
+# shared limiter in flaskr.ratelimit, so the limits hold across workers
+def _login_limits(user_type, email):
+    """Rate limit keys of a login attempt and the failures each may have per window."""
+    return {
+        f'login:ip:{request.remote_addr}': current_app.config['LOGIN_IP_ATTEMPT_LIMIT'],
+        f'login:{user_type}:{email.lower()}': current_app.config['LOGIN_ATTEMPT_LIMIT'],
+    }
+
+def login_rate_limited(user_type, email):
+    return get_login_limiter().exceeded(_login_limits(user_type, email))
+
+def record_failed_login(user_type, email):
+    get_login_limiter().hit(list(_login_limits(user_type, email)))
 
 @bp.route('/student/login', methods=('GET', 'POST'))
 def student_login():
-    if 'login_attempts' not in session:
-        session['login_attempts'] = []
-
     if request.method == 'POST':
         try:
             email = request.form['email']
@@ -241,11 +250,7 @@ def student_login():
             elif not password:
                 error = 'Password is required.'
 
-            now = time.time()
-            attempts = [t for t in session['login_attempts'] if now - t < LOGIN_ATTEMPT_WINDOW]
-            session['login_attempts'] = attempts
-
-            if len(attempts) >= LOGIN_ATTEMPT_LIMIT:
+            if error is None and login_rate_limited('student', email):
                 error = f'Too many login attempts. Please try again in a minute.'
             
             if error is None:
@@ -253,10 +258,10 @@ def student_login():
                 
                 if user is None:
                     error = 'No student account found with this email.'
-                    session['login_attempts'].append(now) # Record failed attempt
+                    record_failed_login('student', email) # Record failed attempt
                 elif not check_password_hash(user['password'], password):
                     error = 'Incorrect password.'
-                    session['login_attempts'].append(now) # Record failed attempt
+                    record_failed_login('student', email) # Record failed attempt
 
             if error is None:
                 db['students'].update_one(
@@ -283,9 +288,6 @@ def student_login():
 
 @bp.route('/recruiter/login', methods=('GET', 'POST'))
 def recruiter_login():
-    if 'login_attempts' not in session:
-        session['login_attempts'] = []
-        
     if request.method == 'POST':
         try:
             email = request.form['email']
@@ -301,11 +303,7 @@ def recruiter_login():
             elif not password:
                 error = 'Password is required.'
             
-            now = time.time()
-            attempts = [t for t in session['login_attempts'] if now - t < LOGIN_ATTEMPT_WINDOW]
-            session['login_attempts'] = attempts
-
-            if len(attempts) >= LOGIN_ATTEMPT_LIMIT:
+            if error is None and login_rate_limited('recruiter', email):
                 error = f'Too many login attempts. Please try again in a minute.'
             
             if error is None:
@@ -313,10 +311,10 @@ def recruiter_login():
                 
                 if user is None:
                     error = 'No recruiter account found with this email.'
-                    session['login_attempts'].append(now)
+                    record_failed_login('recruiter', email)
                 elif not check_password_hash(user['password'], password):
                     error = 'Incorrect password.'
-                    session['login_attempts'].append(now)
+                    record_failed_login('recruiter', email)
             
             if error is None:
                 db['recruiters'].update_one(
@@ -342,16 +340,58 @@ def recruiter_login():
     return render_template('auth/recruiter_login.html')
 
 
+# Endpoints that never look at g.user, besides views marked with public_endpoint
+PUBLIC_ENDPOINTS = {'static'}
+
+def public_endpoint(view):
+    """Mark a view as not needing g.user.
+
+    Requests for it skip the user lookup, and so never open a database
+    connection. Apply it below the route decorator.
+    """
+    view.public_endpoint = True
+    return view
+
+def is_public_endpoint(endpoint):
+    """Whether requests for the endpoint skip loading g.user."""
+    if endpoint in PUBLIC_ENDPOINTS:
+        return True
+    view = current_app.view_functions.get(endpoint)
+    return getattr(view, 'public_endpoint', False)
+
+def invalidate_user(user_type, user_id):
+    """Drop a user from the cache after their document was changed or deleted."""
+    key = (user_type, str(user_id))
+    with _versions_lock:
+        _user_versions[key] = next(_version_counter)
+    _user_cache.invalidate(key)
+
+def get_user(user_type, user_id):
+    """Return a copy of the user's document without USER_PROJECTION fields, or None."""
+    key = (user_type, str(user_id))
+    version = _user_versions.get(key)
+    cached = _user_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return dict(cached[1])
+    
+    db = get_db()
+    collection = db['students'] if user_type == 'student' else db['recruiters']
+    user = collection.find_one({'_id': ObjectId(user_id)}, USER_PROJECTION)
+    if user is None:
+        return None
+    with _versions_lock:
+        if _user_versions.get(key) == version:
+            _user_cache.set(key, (version, user), ttl=current_app.config.get('USER_CACHE_TTL'))
+    return dict(user)
+
 @bp.before_app_request
 def load_logged_in_user():
     user_id = session.get('user_id')
     user_type = session.get('user_type')
 
     g.user = None
-    if user_id and user_type:
-        db = get_db()
-        collection = db['students'] if user_type == 'student' else db['recruiters']
-        user = collection.find_one({'_id': ObjectId(user_id)})
+    if user_id and user_type and not is_public_endpoint(request.endpoint):
+        user = get_user(user_type, user_id)
         if user:
             g.user = user
             g.user['user_type'] = user_type
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Every named cache in the process, so their hit rates can be shown to admins
+_registry = {}
+
+# Stats callables for caches that are not a TTLCache (e.g. Mongo-backed tiers)
+_stats_providers = {}
+
+_MISSING = object()
+
+
+class TTLCache:
+    """A small thread-safe in-process LRU cache whose entries expire after a TTL.
+
+    Each worker process has its own copy, so the TTL bounds how long another
+    worker may serve a value after it was invalidated here.
+    """
+
+    def __init__(self, name, maxsize=128, ttl=300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': size,
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups else None,
+        }
+
+
+def register_stats(name, provider):
+    """Register a callable returning stats in the same shape as TTLCache.stats()."""
+    _stats_providers[name] = provider
+
+
+def get_cache_stats():
+    """Return hit/miss statistics for every registered cache."""
+    stats = [cache.stats() for cache in _registry.values()]
+    stats.extend(provider() for provider in _stats_providers.values())
+    return stats
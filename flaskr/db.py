@@ -1,33 +1,124 @@
 import os
+import threading
 from flask import current_app, g
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ConfigurationError
+from flaskr.profiler import listener as query_listener
 
-def get_db():
-    if 'db' not in g:
-        mongo_uri = os.environ.get('MONGO_URI')
-        if not mongo_uri:
-            raise ValueError('MONGO_URI is not configured in the application settings')
+# Process-wide registry of MongoClient instances keyed by connection URI.
+# A MongoClient owns its own connection pool and is thread-safe, so one client
+# per URI per process is shared by every request instead of reconnecting.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class _ClientEntry:
+    """A pooled client together with the pid that created it and its health."""
+
+    def __init__(self, client):
+        self.client = client
+        self.pid = os.getpid()
+        # Ping lazily: only on first use and after a connection failure.
+        self.healthy = False
+
+
+def _reset_after_fork():
+    """Drop clients inherited from the parent; they are not fork-safe."""
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_mongo_uri():
+    mongo_uri = current_app.config.get('MONGO_URI') or os.environ.get('MONGO_URI')
+    if not mongo_uri:
+        raise ValueError('MONGO_URI is not configured in the application settings')
+    return mongo_uri
+
+
+def _client_options(app):
+    """Build MongoClient keyword arguments from the app config."""
+    return {
+        'serverSelectionTimeoutMS': app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        'maxPoolSize': app.config['MONGO_MAX_POOL_SIZE'],
+        'minPoolSize': app.config['MONGO_MIN_POOL_SIZE'],
+        'maxIdleTimeMS': app.config['MONGO_MAX_IDLE_TIME_MS'],
+        'event_listeners': [query_listener],
+    }
+
+
+def _get_entry(mongo_uri):
+    entry = _clients.get(mongo_uri)
+    if entry is not None and entry.pid == os.getpid():
+        return entry
+
+    with _clients_lock:
+        entry = _clients.get(mongo_uri)
+        # A client created before a fork must not be used (or closed) in the child.
+        if entry is None or entry.pid != os.getpid():
+            client = MongoClient(mongo_uri, **_client_options(current_app))
+            entry = _ClientEntry(client)
+            _clients[mongo_uri] = entry
+    return entry
+
+
+def get_client():
+    """Return the pooled MongoClient for this process, creating it on first use."""
+    entry = _get_entry(_get_mongo_uri())
+    if not entry.healthy:
         try:
-            client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-            # Test the connection
-            client.admin.command('ping')
-            g.db = client.get_default_database()
+            # Test the connection once rather than on every request
+            entry.client.admin.command('ping')
+            entry.healthy = True
         except (ConnectionFailure, ConfigurationError) as e:
             current_app.logger.error(f'Failed to connect to MongoDB: {str(e)}')
             raise
+    return entry.client
+
+
+def get_db():
+    if 'db' not in g:
+        g.db = get_client().get_default_database()
     return g.db
 
+
+def mark_unhealthy():
+    """Force a ping on next use, e.g. after a request hit a connection failure."""
+    for entry in _clients.values():
+        entry.healthy = False
+
+
 def close_db(e=None):
-    db = g.pop('db', None)
-    if db is not None:
-        db.client.close()
+    # The client is shared by the whole process, so only release the handle;
+    # its sockets go back to the pool for the next request.
+    g.pop('db', None)
+    if isinstance(e, ConnectionFailure):
+        mark_unhealthy()
+
+
+def close_clients():
+    """Close every pooled client owned by this process."""
+    with _clients_lock:
+        for entry in list(_clients.values()):
+            if entry.pid == os.getpid():
+                entry.client.close()
+        _clients.clear()
+
 
 def init_app(app):
     """Register database functions with the Flask app."""
     # Ensure MONGO_URI is set in the app config
     if not app.config.get('MONGO_URI'):
         app.config['MONGO_URI'] = os.getenv('MONGO_URI')
-    
-    app.teardown_appcontext(close_db)
 
+    # Connection pool settings, overridable from instance config
+    app.config.setdefault('MONGO_MAX_POOL_SIZE', int(os.getenv('MONGO_MAX_POOL_SIZE', 50)))
+    app.config.setdefault('MONGO_MIN_POOL_SIZE', int(os.getenv('MONGO_MIN_POOL_SIZE', 0)))
+    app.config.setdefault('MONGO_MAX_IDLE_TIME_MS', int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000)))
+    app.config.setdefault('MONGO_SERVER_SELECTION_TIMEOUT_MS', int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)))
+
+    app.teardown_appcontext(close_db)
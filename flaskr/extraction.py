@@ -0,0 +1,471 @@
+import atexit
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+from datetime import datetime
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+from flaskr.db import get_db
+from flaskr.summary_cache import hash_file
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+OCR_CACHE_COLLECTION = 'ocr_results'
+OCR_CACHE_MAX_AGE = 90 * 24 * 3600
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg'}
+
+# OCR preprocessing settings. Tesseract reads best at roughly 300 DPI, which
+# for a page-sized photo means about 2400px on the long side.
+OCR_DEFAULTS = {
+    'preprocess': True,
+    'max_dimension': 2400,
+    'binarize': True,
+    'deskew': True,
+    'max_skew': 5.0,
+}
+
+# Settings in effect in this process; set by init_app and in each extraction worker
+_ocr_options = dict(OCR_DEFAULTS)
+
+# Angle step (degrees) tried when estimating skew, and the size it is estimated at
+SKEW_STEP = 0.5
+SKEW_SAMPLE_SIZE = 800
+
+
+# Document libraries each extraction worker loads when it starts
+WORKER_MODULES = ('PyPDF2', 'docx', 'pytesseract', 'PIL.Image', 'PIL.ImageOps')
+
+
+class ExtractionError(Exception):
+    """Raised when a document could not be extracted within its time or memory budget."""
+
+
+# Nesting depth of Form XObjects searched for fonts before giving up and
+# reading the page anyway
+TEXT_LAYER_MAX_DEPTH = 5
+
+
+def _resources_have_font(resources, depth=0, seen=None):
+    """Whether a resource dictionary, or a Form XObject drawn from it, references a font.
+
+    Returns True when unsure (nesting too deep or unreadable), so the page is read.
+    """
+    if resources is None:
+        return False
+    resources = resources.get_object()
+    if '/Font' in resources:
+        return True
+    if depth >= TEXT_LAYER_MAX_DEPTH:
+        return True
+    seen = set() if seen is None else seen
+    xobjects = resources.get('/XObject')
+    if xobjects is None:
+        return False
+    for reference in xobjects.get_object().values():
+        # Shared forms are checked once
+        key = getattr(reference, 'idnum', None)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        xobject = reference.get_object()
+        if xobject.get('/Subtype') != '/Form':
+            continue
+        # A form without its own resources uses the page's, already checked
+        if _resources_have_font(xobject.get('/Resources'), depth + 1, seen):
+            return True
+    return False
+
+
+def _has_text_layer(page):
+    """Whether a PDF page references any font, directly or through Form XObjects.
+
+    Scanned pages only hold images. Pages whose resources cannot be read are
+    treated as having text, so extract_text decides.
+    """
+    try:
+        return _resources_have_font(page.get('/Resources'))
+    except Exception:
+        return True
+
+
+def iter_pdf_pages(pdf_reader):
+    """Yield the text of each page lazily, skipping image-only pages without parsing them."""
+    for page in pdf_reader.pages:
+        if not _has_text_layer(page):
+            continue
+        yield page.extract_text() or ''
+
+
+def extract_pdf(file_path, max_chars=None):
+    """Extract text content from a PDF file, returning (text, page count)
+
+    Pages are read one at a time and reading stops once max_chars characters
+    have been collected, so long documents are never held in memory whole.
+    """
+    text_content = []
+    collected = 0
+    
+    import PyPDF2
+
+    try:
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            page_count = len(pdf_reader.pages)
+            
+            for page_text in iter_pdf_pages(pdf_reader):
+                text_content.append(page_text)
+                collected += len(page_text) + 1
+                if max_chars and collected >= max_chars:
+                    break
+        
+        text = "\n".join(text_content)
+        return (text[:max_chars] if max_chars else text), page_count
+    except Exception as e:
+        print(f"Error extracting text from PDF: {str(e)}")
+        return "", 0
+
+
+def extract_text_from_pdf(file_path):
+    """Extract text content from a PDF file"""
+    return extract_pdf(file_path)[0]
+
+
+def extract_text_from_docx(file_path):
+    """Extract text content from a Word document"""
+    import docx
+
+    try:
+        doc = docx.Document(file_path)
+        text_content = []
+        
+        # Extract text from paragraphs
+        for para in doc.paragraphs:
+            if para.text.strip():
+                text_content.append(para.text)
+        
+        # Extract text from tables
+        for table in doc.tables:
+            for row in table.rows:
+                row_text = []
+                for cell in row.cells:
+                    if cell.text.strip():
+                        row_text.append(cell.text.strip())
+                if row_text:
+                    text_content.append(" | ".join(row_text))
+        
+        return "\n".join(text_content)
+    except Exception as e:
+        print(f"Error extracting text from DOCX: {str(e)}")
+        return ""
+
+
+def configure_ocr(options):
+    _ocr_options.update(options)
+
+
+def otsu_threshold(gray):
+    """Grey level that best separates ink from paper (Otsu's method)."""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    best_variance, threshold = 0.0, 127
+    background, weighted_background = 0, 0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance, threshold = variance, level
+    return threshold
+
+
+def _row_profile_score(sample, angle):
+    from PIL import Image
+
+    rotated = sample.rotate(angle, resample=Image.BILINEAR, fillcolor=0)
+    # Mean ink per row: level lines give alternating dark and blank rows
+    rows = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+    mean = sum(rows) / len(rows)
+    return sum((row - mean) ** 2 for row in rows)
+
+
+def estimate_skew(binary, max_skew):
+    """Angle that makes text lines horizontal, found by maximizing row-profile variance."""
+    from PIL import ImageOps
+
+    sample = ImageOps.invert(binary.convert('L'))
+    sample.thumbnail((SKEW_SAMPLE_SIZE, SKEW_SAMPLE_SIZE))
+    # Only rotate when another angle is strictly better than leaving the page as is
+    best_angle, best_score = 0.0, _row_profile_score(sample, 0.0)
+    steps = int(max_skew / SKEW_STEP)
+    for step in range(-steps, steps + 1):
+        angle = step * SKEW_STEP
+        if not angle:
+            continue
+        score = _row_profile_score(sample, angle)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess_for_ocr(image, max_dimension=2400, binarize=True, deskew=True, max_skew=5.0, **_):
+    """Prepare a photo or scan for Tesseract: upright, downscaled, grayscale, binarized, deskewed."""
+    from PIL import Image, ImageOps
+
+    # Let the JPEG decoder scale down and drop colour while decoding
+    image.draft('L', (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image).convert('L')
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    if binarize:
+        threshold = otsu_threshold(image)
+        image = image.point(lambda level: 255 if level > threshold else 0)
+    if deskew and max_skew:
+        angle = estimate_skew(image, max_skew)
+        if angle:
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return image
+
+
+def extract_text_from_image(file_path):
+    """Extract text content from an image using OCR"""
+    import pytesseract
+    from PIL import Image
+
+    try:
+        # Open the image
+        image = Image.open(file_path)
+        if _ocr_options['preprocess']:
+            image = preprocess_for_ocr(image, **_ocr_options)
+        
+        # Use pytesseract to extract text
+        text = pytesseract.image_to_string(image)
+        
+        return text
+    except Exception as e:
+        print(f"Error extracting text from image: {str(e)}")
+        return ""
+
+
+def extract_docx(file_path, max_chars=None):
+    """Word documents have no fixed pagination, so no page count is reported"""
+    text = extract_text_from_docx(file_path)
+    return (text[:max_chars] if max_chars else text), None
+
+
+def extract_image(file_path, max_chars=None):
+    text = extract_text_from_image(file_path)
+    return (text[:max_chars] if max_chars else text), 1
+
+
+# Extractors by file extension; each takes (path, max_chars) and returns (text, page count)
+EXTRACTORS = {
+    'pdf': extract_pdf,
+    'doc': extract_docx,
+    'docx': extract_docx,
+    'jpg': extract_image,
+    'jpeg': extract_image,
+}
+
+
+def extract_document(file_path, max_chars=None):
+    """Extract text and page count from a document in this process."""
+    file_extension = file_path.rsplit('.', 1)[1].lower() if '.' in file_path else ''
+    extractor = EXTRACTORS.get(file_extension)
+    if extractor is None:
+        raise ValueError('Unsupported file type')
+    return extractor(file_path, max_chars)
+
+
+def _init_worker(memory_limit_mb, ocr_options):
+    """Pool initializer: apply OCR settings and cap the worker's address space (and Tesseract's, which inherits it)."""
+    configure_ocr(ocr_options)
+    # Workers exist only to extract, so load the document libraries up front
+    # rather than on each worker's first task
+    for module in WORKER_MODULES:
+        importlib.import_module(module)
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+class ExtractionEngine:
+    """Runs document extraction in a pool of worker processes.
+
+    Parsing and OCR are CPU-bound and can be driven into pathological cases by
+    a crafted file, so each task has a wall-clock timeout and each worker a
+    memory ceiling. Workers are replaced after max_tasks_per_child tasks, and
+    the whole pool is killed and rebuilt when a task times out or a worker dies.
+
+    No more tasks are handed to the pool than it has workers, so a task starts
+    as soon as it is submitted and its timeout only covers its own work. Tasks
+    that were running in a pool killed because of another task are run again
+    once on the new pool.
+    """
+
+    def __init__(self, workers=2, timeout=30, max_tasks_per_child=50, memory_limit_mb=512, ocr_options=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.memory_limit_mb = memory_limit_mb
+        self.ocr_options = ocr_options or dict(OCR_DEFAULTS)
+        self._executor = None
+        self._pid = None
+        self._submitted = 0
+        self._lock = threading.Lock()
+        # Callers waiting for a free worker wait here rather than in the pool's queue
+        self._slots = threading.BoundedSemaphore(workers)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                # Recycle workers once the pool has run its share of tasks
+                if self._submitted < self.workers * self.max_tasks_per_child:
+                    self._submitted += 1
+                    return self._executor
+                self._executor.shutdown(wait=False)
+            # spawn rather than fork: the web process has threads and open sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb, self.ocr_options),
+            )
+            self._pid = os.getpid()
+            self._submitted = 1
+            return self._executor
+
+    def _kill(self, executor):
+        """Terminate a pool whose worker is stuck; its other tasks fail and are reported."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, file_path, max_chars):
+        executor = self._get_executor()
+        future = executor.submit(extract_document, file_path, max_chars)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            self._kill(executor)
+            raise ExtractionError(f'Extraction took longer than {self.timeout}s')
+        except (BrokenProcessPool, CancelledError):
+            self._kill(executor)
+            raise BrokenProcessPool('Extraction pool was killed')
+        except MemoryError:
+            raise ExtractionError(f'Extraction exceeded {self.memory_limit_mb}MB')
+
+    def extract(self, file_path, max_chars=None):
+        with self._slots:
+            try:
+                return self._run(file_path, max_chars)
+            except BrokenProcessPool:
+                # The pool may have been killed for another task's timeout or
+                # crash; a second failure on a fresh pool is this file's own
+                try:
+                    return self._run(file_path, max_chars)
+                except BrokenProcessPool:
+                    raise ExtractionError('Extraction worker exited, possibly over its memory limit')
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _ocr_cache_key(file_path):
+    """OCR results depend on the image bytes and on how the image was preprocessed."""
+    options = json.dumps(_ocr_options, sort_keys=True)
+    return hashlib.sha256(f'{hash_file(file_path)}:{options}'.encode('utf-8')).hexdigest()
+
+
+def extract_text(file_path):
+    """Extract (text, page count) from a resume of any supported type.
+
+    Runs in the app's extraction worker pool, or inline when
+    EXTRACTION_IN_PROCESS is set. Only the first EXTRACTION_MAX_CHARS
+    characters are kept; the summary prompt never needs more. OCR output
+    is cached by image hash, so the same image is only OCR'd once.
+    """
+    max_chars = current_app.config['EXTRACTION_MAX_CHARS']
+    file_extension = file_path.rsplit('.', 1)[1].lower() if '.' in file_path else ''
+    
+    cache_key = None
+    if file_extension in IMAGE_EXTENSIONS:
+        cache_key = _ocr_cache_key(file_path)
+        cached = get_db()[OCR_CACHE_COLLECTION].find_one({'_id': cache_key}, {'text': 1})
+        if cached is not None:
+            return cached['text'][:max_chars], 1
+    
+    if current_app.config['EXTRACTION_IN_PROCESS']:
+        text, page_count = extract_document(file_path, max_chars)
+    else:
+        text, page_count = current_app.extensions['extraction_engine'].extract(file_path, max_chars)
+    
+    # Empty output usually means OCR failed; leave it uncached so it is retried
+    if cache_key and text.strip():
+        get_db()[OCR_CACHE_COLLECTION].update_one(
+            {'_id': cache_key},
+            {'$set': {'text': text, 'created_at': datetime.now()}},
+            upsert=True
+        )
+    return text, page_count
+
+
+def init_app(app):
+    """Configure the document extraction worker pool."""
+    app.config.setdefault('EXTRACTION_IN_PROCESS', os.getenv('EXTRACTION_IN_PROCESS', '').lower() in ('1', 'true'))
+    app.config.setdefault('EXTRACTION_WORKERS', int(os.getenv('EXTRACTION_WORKERS', 2)))
+    app.config.setdefault('EXTRACTION_TIMEOUT', 30)
+    app.config.setdefault('EXTRACTION_MAX_TASKS_PER_CHILD', 50)
+    app.config.setdefault('EXTRACTION_MEMORY_LIMIT_MB', 512)
+    # Roughly 6000 tokens of resume text at ~4 characters per token
+    app.config.setdefault('EXTRACTION_MAX_CHARS', 24000)
+    
+    # OCR preprocessing for image resumes
+    app.config.setdefault('OCR_PREPROCESS', OCR_DEFAULTS['preprocess'])
+    app.config.setdefault('OCR_MAX_DIMENSION', OCR_DEFAULTS['max_dimension'])
+    app.config.setdefault('OCR_BINARIZE', OCR_DEFAULTS['binarize'])
+    app.config.setdefault('OCR_DESKEW', OCR_DEFAULTS['deskew'])
+    app.config.setdefault('OCR_MAX_SKEW', OCR_DEFAULTS['max_skew'])
+    ocr_options = {
+        'preprocess': app.config['OCR_PREPROCESS'],
+        'max_dimension': app.config['OCR_MAX_DIMENSION'],
+        'binarize': app.config['OCR_BINARIZE'],
+        'deskew': app.config['OCR_DESKEW'],
+        'max_skew': app.config['OCR_MAX_SKEW'],
+    }
+    configure_ocr(ocr_options)
+
+    engine = ExtractionEngine(
+        workers=app.config['EXTRACTION_WORKERS'],
+        timeout=app.config['EXTRACTION_TIMEOUT'],
+        max_tasks_per_child=app.config['EXTRACTION_MAX_TASKS_PER_CHILD'],
+        memory_limit_mb=app.config['EXTRACTION_MEMORY_LIMIT_MB'],
+        ocr_options=ocr_options,
+    )
+    app.extensions['extraction_engine'] = engine
+    atexit.register(engine.shutdown)
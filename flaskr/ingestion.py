@@ -0,0 +1,115 @@
+import re
+import time
+import unicodedata
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from flask import current_app
+
+from flaskr.db import get_db
+from flaskr.extraction import extract_text
+from flaskr.tasks import QueueFull, get_queue, register_queue
+
+# Name of the background queue that extracts text from newly uploaded resumes
+RESUME_INGESTION_QUEUE = 'resume_ingestion'
+
+# A few very common words per language; enough to tell resumes apart without
+# pulling in a language detection package
+STOPWORDS = {
+    'en': {'the', 'and', 'of', 'to', 'in', 'for', 'with', 'on', 'is', 'as', 'at', 'by', 'from', 'an'},
+    'fr': {'le', 'la', 'les', 'et', 'des', 'du', 'en', 'pour', 'dans', 'avec', 'une', 'sur', 'est'},
+    'de': {'der', 'die', 'das', 'und', 'mit', 'von', 'für', 'ist', 'im', 'den', 'ein', 'eine', 'auf'},
+    'es': {'el', 'la', 'los', 'las', 'y', 'de', 'en', 'con', 'para', 'por', 'una', 'del', 'es'},
+}
+
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b-\x1f\x7f]')
+_SPACES = re.compile(r'[ \t]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+_WORDS = re.compile(r'[^\W\d_]+')
+
+
+def normalize_text(text):
+    """Normalize extracted text: unicode forms, stray control characters and whitespace."""
+    text = unicodedata.normalize('NFKC', text or '')
+    text = text.replace('\r\n', '\n').replace('\r', '\n').replace('\f', '\n')
+    text = _CONTROL_CHARS.sub('', text)
+    lines = [_SPACES.sub(' ', line).strip() for line in text.split('\n')]
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def detect_language(text):
+    """Best-guess language code of the text, or None when it cannot be told."""
+    words = [word.lower() for word in _WORDS.findall(text[:20000])]
+    if not words:
+        return None
+    scores = {lang: sum(1 for word in words if word in stopwords)
+              for lang, stopwords in STOPWORDS.items()}
+    lang, hits = max(scores.items(), key=lambda item: item[1])
+    return lang if hits else None
+
+
+def ingest_resume(student_id, resume_url, file_path):
+    """Extract, normalize and store the text of a student's resume.
+
+    The result is only saved while resume_url is still the student's current
+    resume, so a slow ingestion never overwrites a newer upload.
+    """
+    started = time.perf_counter()
+    raw_text, page_count = extract_text(file_path)
+    extracted = time.perf_counter()
+    text = normalize_text(raw_text)
+    normalized = time.perf_counter()
+
+    extraction = {
+        'resume_url': resume_url,
+        'page_count': page_count,
+        'language': detect_language(text),
+        'characters': len(text),
+        'extract_ms': round((extracted - started) * 1000, 2),
+        'normalize_ms': round((normalized - extracted) * 1000, 2),
+        'extracted_at': datetime.now(),
+    }
+    get_db()['students'].update_one(
+        {'_id': ObjectId(student_id), 'resume_url': resume_url},
+        {'$set': {'resume_text': text, 'resume_extraction': extraction}}
+    )
+    current_app.logger.info(
+        f"Ingested resume {resume_url}: {extraction['characters']} characters, "
+        f"{page_count} pages in {extraction['extract_ms']}ms"
+    )
+    return text
+
+
+def run_ingestion(payload):
+    """Task handler for queued resume ingestion."""
+    ingest_resume(payload['student_id'], payload['resume_url'], payload['path'])
+    return {'resume_url': payload['resume_url']}
+
+
+def queue_resume_ingestion(student_id, resume_url, file_path):
+    """Queue text extraction for a freshly uploaded resume."""
+    try:
+        get_queue(RESUME_INGESTION_QUEUE).submit({
+            'student_id': str(student_id),
+            'resume_url': resume_url,
+            'path': file_path,
+        })
+    except QueueFull:
+        # Consumers extract on first use when the text is missing
+        current_app.logger.warning(f'Resume ingestion queue full; {resume_url} will be extracted on first use')
+
+
+def get_resume_text(student, file_path):
+    """Return the stored text of the student's current resume, extracting it if missing.
+
+    The student document needs resume_url, resume_text and resume_extraction.
+    """
+    extraction = student.get('resume_extraction') or {}
+    if student.get('resume_text') is not None and extraction.get('resume_url') == student['resume_url']:
+        return student['resume_text']
+    return ingest_resume(student['_id'], student['resume_url'], file_path)
+
+
+def init_app(app):
+    """Register the background resume ingestion queue."""
+    register_queue(app, RESUME_INGESTION_QUEUE, run_ingestion)
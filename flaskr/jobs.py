@@ -1,118 +1,250 @@
 import functools
+import click
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, session, url_for, jsonify
+    Blueprint, flash, g, redirect, render_template, request, session, url_for, jsonify, current_app
 )
+from pymongo import UpdateOne
 from werkzeug.exceptions import abort
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
 import datetime
 
 from flaskr.db import get_db
+from flaskr.cache import TTLCache
 from flaskr.auth import login_required, recruiter_required, student_required
 
 bp = Blueprint('jobs', __name__, url_prefix='/jobs')
 
-@bp.route('/')
-def index():
-    """Show all job listings with filtering options."""
-    db = get_db()
+# Job fields shown alongside each application on the my-applications page
+MY_APPLICATIONS_JOB_FIELDS = {'title': 1, 'company_name': 1, 'company_logo': 1}
+
+# Job board page size, and the fields it leaves out of list views
+JOBS_PER_PAGE = 20
+JOB_LIST_PROJECTION = {'description': 0}
+
+# Maximum number of ranked results returned by the job search
+JOB_SEARCH_LIMIT = 50
+
+# Filter dropdown values for the job board, refreshed at least every JOB_FACETS_TTL seconds
+JOB_FACETS_TTL = 300
+_job_facet_cache = TTLCache('job_facets', maxsize=1, ttl=JOB_FACETS_TTL)
+
+def _facet_values(field, unwind=False):
+    """Pipeline for the sorted distinct non-empty values of one job field."""
+    stages = [{'$unwind': f'${field}'}] if unwind else []
+    stages += [
+        {'$match': {field: {'$nin': [None, '']}}},
+        {'$group': {'_id': f'${field}'}},
+        {'$sort': {'_id': 1}}
+    ]
+    return stages
+
+def get_job_facets(db):
+    """Return the filter dropdown values, computed by one $facet aggregation and cached."""
+    facets = _job_facet_cache.get('facets')
+    if facets is None:
+        pipeline = [{'$facet': {
+            'branches': _facet_values('eligible_branches', unwind=True),
+            'companies': _facet_values('company_name'),
+            'job_types': _facet_values('job_type'),
+            'locations': _facet_values('location')
+        }}]
+        result = next(db['jobs'].aggregate(pipeline), {})
+        facets = {name: [row['_id'] for row in result.get(name, [])]
+                  for name in ('branches', 'companies', 'job_types', 'locations')}
+        _job_facet_cache.set('facets', facets, ttl=current_app.config.get('JOB_FACETS_TTL'))
+    return facets
+
+def invalidate_job_facets():
+    """Drop the cached filter values after jobs are created, updated or deleted."""
+    _job_facet_cache.invalidate('facets')
+
+def encode_cursor(job):
+    """Encode the (created_at, _id) position of a job for keyset pagination.
+
+    Jobs saved before created_at was recorded have an empty date part.
+    """
+    created_at = job.get('created_at')
+    return f"{created_at.isoformat() if created_at else ''}_{job['_id']}"
+
+def decode_cursor(value):
+    """Parse a pagination cursor, ignoring anything malformed."""
+    if not value:
+        return None
+    try:
+        created_at, last_id = value.rsplit('_', 1)
+        return (datetime.datetime.fromisoformat(created_at) if created_at else None), ObjectId(last_id)
+    except (ValueError, InvalidId):
+        return None
+
+def after_cursor(cursor):
+    """Query for the jobs that come after a cursor, newest first.
+
+    Jobs without a created_at sort after every dated job, ordered by _id.
+    """
+    created_at, last_id = cursor
+    if created_at is None:
+        return {'created_at': None, '_id': {'$lt': last_id}}
+    return {'$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': last_id}},
+        {'created_at': None}
+    ]}
+
+def get_job_filters():
+    """Read the job board filter parameters from the request."""
+    return {
+        'min_cgpa': request.args.get('min_cgpa', type=float),
+        'branch': request.args.get('branch'),
+        'company': request.args.get('company'),
+        'job_type': request.args.get('job_type'),
+        'location': request.args.get('location'),
+        'eligible_only': request.args.get('eligible_only') == '1' or None
+    }
+
+def is_student():
+    return bool(g.user) and g.user.get('user_type') == 'student'
+
+def is_eligible(student, job):
+    """Check a student's CGPA and branch against a job's eligibility rules."""
+    return (
+        student.get('cgpa', 0) >= job.get('min_cgpa', 0) and
+        (not job.get('eligible_branches') or student.get('branch', '') in job.get('eligible_branches', []))
+    )
+
+def eligibility_query(student):
+    """The Mongo equivalent of is_eligible, so ineligible jobs are filtered in the database."""
+    return {'$and': [
+        {'$or': [
+            {'min_cgpa': {'$lte': student.get('cgpa', 0)}},
+            {'min_cgpa': None}
+        ]},
+        {'$or': [
+            {'eligible_branches': student.get('branch', '')},
+            # Equality with [] rather than $size, which the eligibility index cannot serve
+            {'eligible_branches': []},
+            {'eligible_branches': None}
+        ]}
+    ]}
+
+def build_job_query(filters):
+    """Translate the job board filters into an indexable Mongo query."""
+    query = {}
+    
+    if filters['min_cgpa'] is not None:
+        # Convert to float to ensure proper comparison
+        query['min_cgpa'] = {'$lte': float(filters['min_cgpa'])}
     
-    # Retrieve job listings without debug messages
+    if filters['branch']:
+        query['eligible_branches'] = filters['branch']
     
-    # Get filter parameters
-    min_cgpa = request.args.get('min_cgpa', type=float)
-    branch = request.args.get('branch')
-    company = request.args.get('company')
-    job_type = request.args.get('job_type')
-    location = request.args.get('location')
+    # Company and location come from the facet dropdowns, so match them exactly;
+    # free-text matching goes through the text index in search()
+    if filters['company']:
+        query['company_name'] = filters['company']
     
-    # Build the query
-    query = {}
+    if filters['job_type']:
+        query['job_type'] = filters['job_type']
     
-    if min_cgpa is not None:
-        # Convert to float to ensure proper comparison
-        min_cgpa_float = float(min_cgpa)
-        query['min_cgpa'] = {'$lte': min_cgpa_float}
+    if filters['location']:
+        query['location'] = filters['location']
     
-    if branch:
-        query['eligible_branches'] = branch
+    if filters['eligible_only'] and is_student():
+        query = {'$and': [query, eligibility_query(g.user)]} if query else eligibility_query(g.user)
     
-    if company:
-        query['company_name'] = {'$regex': company, '$options': 'i'}
+    return query
+
+def prepare_job_list(jobs):
+    """Convert ids for the template and flag eligibility for students."""
+    for job in jobs:
+        job['_id'] = str(job['_id'])
     
-    if job_type:
-        query['job_type'] = job_type
+    # Check eligibility for each job if user is a student
+    if is_student():
+        for job in jobs:
+            job['is_eligible'] = is_eligible(g.user, job)
+    return jobs
+
+def render_job_board(jobs, filters, **context):
+    """Render the job board with its filter dropdowns."""
+    try:
+        facets = get_job_facets(get_db())
+    except Exception as e:
+        flash(f'Error retrieving job filters: {str(e)}', 'error')
+        facets = {'branches': [], 'companies': [], 'job_types': [], 'locations': []}
     
-    if location:
-        query['location'] = {'$regex': location, '$options': 'i'}
+    context.setdefault('next_cursor', None)
+    context.setdefault('is_first_page', True)
+    context.setdefault('search_query', None)
+    return render_template('jobs/index.html', 
+                          jobs=jobs,
+                          all_branches=facets['branches'],
+                          all_companies=facets['companies'],
+                          all_job_types=facets['job_types'],
+                          all_locations=facets['locations'],
+                          filters=filters,
+                          **context)
+
+@bp.route('/')
+def index():
+    """Show all job listings with filtering options."""
+    db = get_db()
+    filters = get_job_filters()
+    query = build_job_query(filters)
+    
+    per_page = current_app.config.get('JOBS_PER_PAGE', JOBS_PER_PAGE)
+    cursor = decode_cursor(request.args.get('after'))
+    next_cursor = None
     
     try:
-        # Get all job listings that match the query
-        jobs = list(db['jobs'].find(query).sort('created_at', -1))
-        
-        # Process job listings without debug messages
-        
-        # Convert ObjectId to string for each job
-        for job in jobs:
-            job['_id'] = str(job['_id'])
-        
-        # Get unique values for filter dropdowns
-        all_branches = []
-        all_companies = []
-        all_job_types = []
-        all_locations = []
-        
-        # Get all jobs for dropdown values if no jobs match the query
-        all_jobs = list(db['jobs'].find())
+        # Get one page of matching listings, newest first, starting after the cursor
+        page_query = query
+        if cursor:
+            page_query = {'$and': [query, after_cursor(cursor)]}
+        jobs = list(
+            db['jobs'].find(page_query, JOB_LIST_PROJECTION)
+            .sort([('created_at', -1), ('_id', -1)])
+            .limit(per_page + 1)
+        )
         
-        # Extract unique values for dropdowns
-        for job in all_jobs:
-            # Handle branches (which is a list)
-            if 'eligible_branches' in job and job['eligible_branches']:
-                for branch_item in job['eligible_branches']:
-                    if branch_item and branch_item not in all_branches:
-                        all_branches.append(branch_item)
-            
-            # Handle other fields
-            if 'company_name' in job and job['company_name'] and job['company_name'] not in all_companies:
-                all_companies.append(job['company_name'])
-            
-            if 'job_type' in job and job['job_type'] and job['job_type'] not in all_job_types:
-                all_job_types.append(job['job_type'])
-            
-            if 'location' in job and job['location'] and job['location'] not in all_locations:
-                all_locations.append(job['location'])
+        # The extra row only tells us whether there is another page
+        if len(jobs) > per_page:
+            jobs = jobs[:per_page]
+            next_cursor = encode_cursor(jobs[-1])
         
-        # Check eligibility for each job if user is a student
-        if g.user and g.user.get('user_type') == 'student':
-            student_cgpa = g.user.get('cgpa', 0)
-            student_branch = g.user.get('branch', '')
-            
-            for job in jobs:
-                job['is_eligible'] = (
-                    student_cgpa >= job.get('min_cgpa', 0) and
-                    (not job.get('eligible_branches') or student_branch in job.get('eligible_branches', []))
-                )
+        prepare_job_list(jobs)
     except Exception as e:
         flash(f'Error retrieving job listings: {str(e)}', 'error')
         jobs = []
-        all_branches = []
-        all_companies = []
-        all_job_types = []
-        all_locations = []
     
-    return render_template('jobs/index.html', 
-                          jobs=jobs,
-                          all_branches=all_branches,
-                          all_companies=all_companies,
-                          all_job_types=all_job_types,
-                          all_locations=all_locations,
-                          filters={
-                              'min_cgpa': min_cgpa,
-                              'branch': branch,
-                              'company': company,
-                              'job_type': job_type,
-                              'location': location
-                          })
+    return render_job_board(jobs, filters,
+                            next_cursor=next_cursor,
+                            is_first_page=cursor is None)
+
+@bp.route('/search')
+def search():
+    """Full-text search over job title, description, company and location."""
+    search_query = request.args.get('q', '').strip()
+    filters = get_job_filters()
+    if not search_query:
+        return redirect(url_for('jobs.index', **{k: v for k, v in filters.items() if v}))
+    
+    query = build_job_query(filters)
+    query['$text'] = {'$search': search_query}
+    
+    try:
+        # Best matches first (weighted by the job_search text index), then newest
+        jobs = list(
+            get_db()['jobs'].find(query, JOB_LIST_PROJECTION)
+            .sort([('score', {'$meta': 'textScore'}), ('created_at', -1)])
+            .limit(current_app.config.get('JOB_SEARCH_LIMIT', JOB_SEARCH_LIMIT))
+        )
+        prepare_job_list(jobs)
+    except Exception as e:
+        flash(f'Error searching job listings: {str(e)}', 'error')
+        jobs = []
+    
+    return render_job_board(jobs, filters, search_query=search_query)
 
 @bp.route('/create', methods=('GET', 'POST'))
 @recruiter_required
@@ -177,6 +309,7 @@ def create():
                     'eligible_branches': eligible_branches,
                     'application_deadline': deadline_date,
                     'created_at': datetime.datetime.now(),
+                    'application_count': 0,
                     'recruiter_id': g.user['_id'],
                     'recruiter_name': g.user.get('full_name', 'Recruiter'),
                     'company_logo': g.user.get('company_logo', '')
@@ -184,6 +317,7 @@ def create():
                 
                 if not result.inserted_id:
                     flash('Failed to create job listing. Please try again.', 'error')
+                invalidate_job_facets()
             except Exception as e:
                 error = f'An error occurred: {str(e)}'
                 flash(error, 'error')
@@ -224,14 +358,8 @@ def detail(id):
     job = get_job(id)
     
     # Check eligibility if user is a student
-    if g.user and g.user.get('user_type') == 'student':
-        student_cgpa = g.user.get('cgpa', 0)
-        student_branch = g.user.get('branch', '')
-        
-        job['is_eligible'] = (
-            student_cgpa >= job.get('min_cgpa', 0) and
-            (not job.get('eligible_branches') or student_branch in job.get('eligible_branches', []))
-        )
+    if is_student():
+        job['is_eligible'] = is_eligible(g.user, job)
     
     # Check if student has already applied
     has_applied = False
@@ -305,6 +433,7 @@ def update(id):
                     'updated_at': datetime.datetime.now()
                 }}
             )
+            invalidate_job_facets()
             
             flash('Job listing updated successfully!', 'success')
             return redirect(url_for('jobs.detail', id=id))
@@ -354,6 +483,7 @@ def delete(id):
     
     db = get_db()
     db['jobs'].delete_one({'_id': ObjectId(id)})
+    invalidate_job_facets()
     
     flash('Job listing deleted successfully!', 'success')
     return redirect(url_for('jobs.index'))
@@ -384,17 +514,12 @@ def apply(id):
     student_cgpa = g.user.get('cgpa', 0)
     student_branch = g.user.get('branch', '')
     
-    is_eligible = (
-        student_cgpa >= job.get('min_cgpa', 0) and
-        (not job.get('eligible_branches') or student_branch in job.get('eligible_branches', []))
-    )
-    
-    if not is_eligible:
+    if not is_eligible(g.user, job):
         flash('You do not meet the eligibility criteria for this job.', 'error')
         return redirect(url_for('jobs.detail', id=id))
     
     # Create application
-    db['applications'].insert_one({
+    result = db['applications'].insert_one({
         'job_id': ObjectId(id),
         'student_id': g.user['_id'],
         'student_name': g.user.get('full_name', ''),
@@ -407,10 +532,44 @@ def apply(id):
         'status': 'Applied',
         'created_at': datetime.datetime.now()
     })
+    if result.inserted_id:
+        adjust_application_count(db, job['_id'], 1)
     
     flash('Application submitted successfully!', 'success')
     return redirect(url_for('jobs.detail', id=id))
 
+def count_applications(db, job_ids):
+    """Count applications for many jobs with a single $group aggregation."""
+    if not job_ids:
+        return {}
+    pipeline = [
+        {'$match': {'job_id': {'$in': list(job_ids)}}},
+        {'$group': {'_id': '$job_id', 'count': {'$sum': 1}}}
+    ]
+    return {row['_id']: row['count'] for row in db['applications'].aggregate(pipeline)}
+
+def adjust_application_count(db, job_id, delta):
+    """Keep the denormalized application_count on a job in step with its applications."""
+    db['jobs'].update_one({'_id': job_id}, {'$inc': {'application_count': delta}})
+
+@bp.cli.command('reconcile-counts')
+def reconcile_counts_command():
+    """Repair drift in the denormalized application_count of every job."""
+    db = get_db()
+    
+    pipeline = [{'$group': {'_id': '$job_id', 'count': {'$sum': 1}}}]
+    actual_counts = {row['_id']: row['count'] for row in db['applications'].aggregate(pipeline)}
+    
+    repairs = []
+    for job in db['jobs'].find({}, {'application_count': 1}):
+        actual = actual_counts.get(job['_id'], 0)
+        if job.get('application_count') != actual:
+            repairs.append(UpdateOne({'_id': job['_id']}, {'$set': {'application_count': actual}}))
+    
+    if repairs:
+        db['jobs'].bulk_write(repairs, ordered=False)
+    click.echo(f'Repaired application_count on {len(repairs)} job(s).')
+
 @bp.route('/my-listings')
 @recruiter_required
 def my_listings():
@@ -421,13 +580,16 @@ def my_listings():
         # Get jobs created by the current recruiter
         jobs = list(db['jobs'].find({'recruiter_id': g.user['_id']}).sort('created_at', -1))
         
+        # Count applications for all jobs in one pass unless counts are denormalized
+        if current_app.config.get('DENORMALIZED_APPLICATION_COUNTS'):
+            counts = {job['_id']: job.get('application_count', 0) for job in jobs}
+        else:
+            counts = count_applications(db, [job['_id'] for job in jobs])
+        
         # Convert ObjectId to string for each job
         for job in jobs:
-            job_id = job['_id']
+            job['application_count'] = counts.get(job['_id'], 0)
             job['_id'] = str(job['_id'])
-            
-            # Count applications for each job - use the ObjectId for querying
-            job['application_count'] = db['applications'].count_documents({'job_id': job_id})
     except Exception as e:
         flash(f'Error retrieving job listings: {str(e)}', 'error')
         jobs = []
@@ -446,22 +608,25 @@ def my_applications():
     try:
         applications = list(db['applications'].find({'student_id': g.user['_id']}).sort('created_at', -1))
         
-        # Get job details for each application
+        # Load every referenced job in one query, limited to the fields the template uses
+        job_ids = list({app['job_id'] for app in applications if app.get('job_id')})
+        jobs = {}
+        if job_ids:
+            for job in db['jobs'].find({'_id': {'$in': job_ids}}, MY_APPLICATIONS_JOB_FIELDS):
+                jobs[job['_id']] = job
+        
+        # Attach job details to each application
         for app in applications:
             # Ensure the application ID is a string
             app['_id'] = str(app['_id'])
             
             if 'job_id' in app:
-                # Store the original job_id (ObjectId)
-                original_job_id = app['job_id']
+                job = jobs.get(app['job_id'])
                 
                 # Convert job_id to string for template use
                 app['job_id'] = str(app['job_id'])
                 
-                # Get the job details
-                job = db['jobs'].find_one({'_id': original_job_id})
                 if job:
-                    # Convert ObjectId to string
                     job['_id'] = str(job['_id'])
                     
                     # Store job details directly in the application object
@@ -473,6 +638,11 @@ def my_applications():
                         
                     # Store job as a separate property for templates that expect it
                     app['job'] = job
+                else:
+                    # The job has been deleted since the student applied
+                    app['job_deleted'] = True
+                    app['job_title'] = app.get('job_title') or 'Unknown Job'
+                    app['company_name'] = app.get('company_name') or 'Unknown Company'
     except Exception as e:
         flash(f'Error retrieving applications: {str(e)}', 'error')
         applications = []
@@ -1,25 +1,126 @@
 import os
-import traceback
+import threading
 import re
-from twilio.rest import Client
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
 from flask import current_app, flash
+from flaskr.db import get_db
+from flaskr.tasks import QueueFull, RetryableError, get_queue, register_queue
 
-def send_sms(to_number, message):
-    """
-    Send an SMS notification to a user using Twilio.
-    
-    Args:
-        to_number (str): The recipient's phone number in E.164 format (e.g., +1234567890)
-        message (str): The message content to send
+# Name of the background queue that delivers SMS messages
+SMS_QUEUE = 'sms'
+
+# Messages that could not be delivered after every retry
+SMS_DEAD_LETTERS = 'sms_dead_letters'
+
+# Delivery states recorded under sms.status on the notification document
+SMS_QUEUED = 'queued'
+SMS_SENDING = 'sending'
+SMS_RETRYING = 'retrying'
+SMS_SENT = 'sent'
+SMS_FAILED = 'failed'
+SMS_DISABLED = 'disabled'
+
+# Placeholder values from the sample .env that mean "not configured"
+PLACEHOLDER_CREDENTIALS = {'your_account_sid_here', 'your_auth_token_here', 'your_twilio_phone_number_here'}
+
+
+class TwilioTransport:
+    """Sends SMS through Twilio, reusing one client (and its HTTP connections) per process."""
+
+    def __init__(self, account_sid, auth_token, from_number):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from twilio.rest import Client
+                    
+                    current_app.logger.info("Creating Twilio client...")
+                    self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def send(self, to_number, message):
+        """Send a message and return the provider's message id."""
+        from twilio.base.exceptions import TwilioRestException
         
-    Returns:
-        bool: True if the message was sent successfully, False otherwise
+        try:
+            sms_response = self.client.messages.create(
+                body=message,
+                from_=self.from_number,
+                to=to_number
+            )
+        except TwilioRestException as e:
+            # Rate limits and provider outages are worth retrying; bad numbers are not
+            if e.status == 429 or e.status >= 500:
+                raise RetryableError(f"Twilio error {e.status}: {e.msg}")
+            raise
+        except Exception as e:
+            # Timeouts and connection errors
+            raise RetryableError(f"Twilio request failed: {str(e)}")
+        return sms_response.sid
+
+
+class FakeTransport:
+    """Records messages instead of sending them, for tests and offline development.
+
+    Set fail_next to make that many upcoming sends fail with a retryable error.
     """
-    # Print debug info
-    current_app.logger.info(f"Sending SMS to: {to_number}")
-    current_app.logger.info(f"Message: {message}")
+
+    def __init__(self):
+        self.sent = []
+        self.fail_next = 0
+        self._lock = threading.Lock()
+
+    def send(self, to_number, message):
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                raise RetryableError("Fake transport failure")
+            self.sent.append({'to': to_number, 'message': message})
+            return f"FAKE{len(self.sent):06d}"
+
+
+def _twilio_transport():
+    account_sid = os.environ.get('TWILIO_ACCOUNT_SID', '')
+    auth_token = os.environ.get('TWILIO_AUTH_TOKEN', '')
+    from_number = os.environ.get('TWILIO_PHONE_NUMBER', '')
+    
+    # Check for missing credentials
+    for name, value in (('Account SID', account_sid), ('Auth Token', auth_token), ('Phone Number', from_number)):
+        if not value.strip() or value in PLACEHOLDER_CREDENTIALS:
+            current_app.logger.error(f"ERROR: Twilio {name} is missing or invalid in .env file. SMS will not be sent.")
+            return None
     
-    # Validate phone number format
+    masked_sid = account_sid[:4] + '****' + account_sid[-4:] if len(account_sid) > 8 else '****'
+    current_app.logger.info(f"Using Twilio Account SID: {masked_sid}, phone: {from_number}")
+    return TwilioTransport(account_sid, auth_token, from_number)
+
+
+def create_transport(app):
+    """Build the SMS transport named by SMS_TRANSPORT: 'twilio', 'fake' or 'disabled'."""
+    transport = app.config['SMS_TRANSPORT']
+    if transport == 'fake':
+        return FakeTransport()
+    if transport == 'twilio':
+        with app.app_context():
+            return _twilio_transport()
+    return None
+
+
+def get_transport():
+    return current_app.extensions.get('sms_transport')
+
+
+def normalize_phone(to_number):
+    """Return the number in E.164 format, or None if it is not a valid number."""
     if not to_number.startswith('+'):
         # Add +91 prefix for Indian numbers if not already present
         if to_number.startswith('91'):
@@ -29,86 +130,169 @@ def send_sms(to_number, message):
     
     # Ensure the phone number is in E.164 format (only digits and + sign)
     if not re.match(r'^\+[1-9]\d{1,14}$', to_number):
+        return None
+    return to_number
+
+
+def _sms_status_update(status, **fields):
+    update = {'sms.status': status, 'sms.updated_at': datetime.now()}
+    update.update({f'sms.{name}': value for name, value in fields.items()})
+    return {'$set': update}
+
+
+def record_sms_status(notification_id, status, **fields):
+    """Record the delivery state of a notification's SMS on the notification document."""
+    if notification_id is None:
+        return
+    get_db()['notifications'].update_one({'_id': ObjectId(notification_id)}, _sms_status_update(status, **fields))
+
+
+def send_sms(to_number, message, notification_id=None):
+    """
+    Queue an SMS notification for background delivery.
+    
+    Args:
+        to_number (str): The recipient's phone number in E.164 format (e.g., +1234567890)
+        message (str): The message content to send
+        notification_id: The notification the SMS belongs to, to record its delivery status
+        
+    Returns:
+        bool: True if the message was queued, False if it will not be sent
+    """
+    current_app.logger.info(f"Queueing SMS to: {to_number}")
+    
+    normalized = normalize_phone(to_number)
+    if normalized is None:
         current_app.logger.error(f"Invalid phone number format: {to_number}")
+        record_sms_status(notification_id, SMS_FAILED, to=to_number, error='Invalid phone number')
         return False
     
+    if get_transport() is None:
+        current_app.logger.info("SMS is disabled. SMS will not be sent.")
+        record_sms_status(notification_id, SMS_DISABLED, to=normalized)
+        return False
+    
+    # Recorded before submitting so a fast worker's status is never overwritten
+    record_sms_status(notification_id, SMS_QUEUED, to=normalized)
     try:
-        # Check if Twilio is enabled
-        twilio_enabled = os.environ.get('TWILIO_ENABLED', 'False').lower() in ('true', '1', 't')
-        if not twilio_enabled:
-            current_app.logger.info("Twilio is disabled in .env file. SMS will not be sent.")
-            return False
-            
-        # Get Twilio credentials from environment variables
-        account_sid = os.environ.get('TWILIO_ACCOUNT_SID', '')
-        auth_token = os.environ.get('TWILIO_AUTH_TOKEN', '')
-        from_number = os.environ.get('TWILIO_PHONE_NUMBER', '')
-        
-        # Log the credentials (with partial masking for security)
-        if account_sid:
-            masked_sid = account_sid[:4] + '****' + account_sid[-4:] if len(account_sid) > 8 else '****'
-            current_app.logger.info(f"Using Twilio Account SID: {masked_sid}")
-        
-        if auth_token:
-            masked_token = auth_token[:2] + '****' + auth_token[-2:] if len(auth_token) > 4 else '****'
-            current_app.logger.info(f"Using Twilio Auth Token: {masked_token}")
-            
-        current_app.logger.info(f"Using Twilio phone: {from_number}")
-        
-        # Check for missing credentials
-        if not account_sid or account_sid == "your_account_sid_here" or not account_sid.strip():
-            error_msg = "ERROR: Twilio Account SID is missing or invalid in .env file"
-            current_app.logger.error(error_msg)
-            flash(error_msg, 'error')
-            return False
-            
-        if not auth_token or auth_token == "your_auth_token_here" or not auth_token.strip():
-            error_msg = "ERROR: Twilio Auth Token is missing or invalid in .env file"
-            current_app.logger.error(error_msg)
-            flash(error_msg, 'error')
-            return False
-            
-        if not from_number or from_number == "your_twilio_phone_number_here" or not from_number.strip():
-            error_msg = "ERROR: Twilio Phone Number is missing or invalid in .env file"
-            current_app.logger.error(error_msg)
-            flash(error_msg, 'error')
-            return False
-        
-        # Initialize Twilio client
-        current_app.logger.info("Creating Twilio client...")
-        client = Client(account_sid, auth_token)
-        
-        # Send the message
-        current_app.logger.info(f"Sending message from {from_number} to {to_number}")
-        sms_response = client.messages.create(
-            body=message,
-            from_=from_number,
-            to=to_number
-        )
-        
-        # Log success
-        current_app.logger.info(f"Success! SMS sent with SID: {sms_response.sid}")
-        return True
-        
-    except Exception as e:
-        # Log the full error with traceback
-        error_msg = f"Failed to send SMS: {str(e)}"
-        current_app.logger.error(error_msg)
-        current_app.logger.error(traceback.format_exc())
-        flash(f"SMS notification could not be sent: {str(e)}", 'error')
+        get_queue(SMS_QUEUE).submit({
+            'to': normalized,
+            'message': message,
+            'notification_id': str(notification_id) if notification_id else None,
+        })
+    except QueueFull:
+        current_app.logger.error(f"SMS queue is full; message to {normalized} dropped")
+        record_sms_status(notification_id, SMS_FAILED, error='SMS queue is full')
         return False
+    return True
 
 
-def notify_student_shortlisted(student, job):
+def send_sms_batch(messages):
+    """
+    Queue many SMS notifications at once.
+    
+    Args:
+        messages (list): dicts with 'to', 'message' and optionally 'notification_id'
+        
+    Returns:
+        list: the SMS status of each message: queued, failed or disabled
+    """
+    statuses = []
+    status_updates = []
+    payloads = []
+    queued_indexes = []
+    transport = get_transport()
+    for item in messages:
+        notification_id = item.get('notification_id')
+        normalized = normalize_phone(item['to'])
+        if normalized is None:
+            status, fields = SMS_FAILED, {'to': item['to'], 'error': 'Invalid phone number'}
+        elif transport is None:
+            status, fields = SMS_DISABLED, {'to': normalized}
+        else:
+            status, fields = SMS_QUEUED, {'to': normalized}
+            queued_indexes.append(len(statuses))
+            payloads.append({
+                'to': normalized,
+                'message': item['message'],
+                'notification_id': str(notification_id) if notification_id else None,
+            })
+        statuses.append(status)
+        if notification_id is not None:
+            status_updates.append(UpdateOne({'_id': ObjectId(notification_id)}, _sms_status_update(status, **fields)))
+    
+    # Statuses are recorded before submitting so a fast worker's status is never overwritten
+    if status_updates:
+        get_db()['notifications'].bulk_write(status_updates, ordered=False)
+    if payloads:
+        task_ids = get_queue(SMS_QUEUE).submit_many(payloads)
+        for index, payload, task_id in zip(queued_indexes, payloads, task_ids):
+            if task_id is None:
+                current_app.logger.error(f"SMS queue is full; message to {payload['to']} dropped")
+                statuses[index] = SMS_FAILED
+                record_sms_status(payload['notification_id'], SMS_FAILED, error='SMS queue is full')
+    return statuses
+
+
+def deliver_sms(payload):
+    """Task handler: send one queued SMS through the configured transport."""
+    notification_id = payload.get('notification_id')
+    record_sms_status(notification_id, SMS_SENDING)
+    try:
+        sid = get_transport().send(payload['to'], payload['message'])
+    except RetryableError as e:
+        record_sms_status(notification_id, SMS_RETRYING, error=str(e))
+        raise
+    
+    current_app.logger.info(f"Success! SMS sent with SID: {sid}")
+    record_sms_status(notification_id, SMS_SENT, sid=sid, sent_at=datetime.now(), error=None)
+    return {'sid': sid}
+
+
+def dead_letter_sms(task_id, payload, error):
+    """Keep undeliverable messages for inspection and mark their notifications failed."""
+    current_app.logger.error(f"SMS to {payload.get('to')} failed permanently: {error}")
+    get_db()[SMS_DEAD_LETTERS].insert_one({
+        'task_id': task_id,
+        'to': payload.get('to'),
+        'message': payload.get('message'),
+        'notification_id': payload.get('notification_id'),
+        'error': error,
+        'created_at': datetime.now(),
+    })
+    record_sms_status(payload.get('notification_id'), SMS_FAILED, error=error)
+
+
+def shortlisted_message(job):
+    company_name = job.get('company_name', 'A company')
+    job_title = job.get('title', 'a position')
+    return f"Congratulations! You have been shortlisted for {job_title} at {company_name}. Log in to CareerBridge to check the details and next steps."
+
+
+def selected_message(job):
+    company_name = job.get('company_name', 'A company')
+    job_title = job.get('title', 'a position')
+    return f"Great news! You have been SELECTED for {job_title} at {company_name}. Congratulations on your success! Log in to CareerBridge for more details."
+
+
+# SMS sent to the student when an application moves to one of these statuses
+STATUS_SMS_MESSAGES = {
+    'Shortlisted': shortlisted_message,
+    'Selected': selected_message,
+}
+
+
+def notify_student_shortlisted(student, job, notification_id=None):
     """
     Send an SMS notification to a student when they are shortlisted for a job.
     
     Args:
         student (dict): The student document from the database
         job (dict): The job document from the database
+        notification_id: The in-app notification this SMS accompanies
         
     Returns:
-        bool: True if the notification was sent successfully, False otherwise
+        bool: True if the notification was queued, False otherwise
     """
     if not student.get('phone'):
         error_msg = f"Cannot send SMS notification: Student {student.get('_id')} has no phone number"
@@ -121,25 +305,23 @@ def notify_student_shortlisted(student, job):
     current_app.logger.info(f"Student phone number from database: {to_number}")
     
     # Create the message
-    company_name = job.get('company_name', 'A company')
-    job_title = job.get('title', 'a position')
-    
-    message = f"Congratulations! You have been shortlisted for {job_title} at {company_name}. Log in to CareerBridge to check the details and next steps."
+    message = shortlisted_message(job)
     
     # Send the SMS
-    return send_sms(to_number, message)
+    return send_sms(to_number, message, notification_id)
 
 
-def notify_student_selected(student, job):
+def notify_student_selected(student, job, notification_id=None):
     """
     Send an SMS notification to a student when they are selected for a job.
     
     Args:
         student (dict): The student document from the database
         job (dict): The job document from the database
+        notification_id: The in-app notification this SMS accompanies
         
     Returns:
-        bool: True if the notification was sent successfully, False otherwise
+        bool: True if the notification was queued, False otherwise
     """
     if not student.get('phone'):
         error_msg = f"Cannot send SMS notification: Student {student.get('_id')} has no phone number"
@@ -152,16 +334,13 @@ def notify_student_selected(student, job):
     current_app.logger.info(f"Student phone number from database: {to_number}")
     
     # Create the message
-    company_name = job.get('company_name', 'A company')
-    job_title = job.get('title', 'a position')
-    
-    message = f"Great news! You have been SELECTED for {job_title} at {company_name}. Congratulations on your success! Log in to CareerBridge for more details."
+    message = selected_message(job)
     
     # Send the SMS
-    return send_sms(to_number, message)
+    return send_sms(to_number, message, notification_id)
 
 
-def notify_student_interview_scheduled(student, job, interview):
+def notify_student_interview_scheduled(student, job, interview, notification_id=None):
     """
     Send an SMS notification to a student when an interview is scheduled.
     
@@ -169,9 +348,10 @@ def notify_student_interview_scheduled(student, job, interview):
         student (dict): The student document from the database
         job (dict): The job document from the database
         interview (dict): The interview document from the database
+        notification_id: The in-app notification this SMS accompanies
         
     Returns:
-        bool: True if the notification was sent successfully, False otherwise
+        bool: True if the notification was queued, False otherwise
     """
     if not student.get('phone'):
         error_msg = f"Cannot send SMS notification: Student {student.get('_id')} has no phone number"
@@ -197,10 +377,10 @@ def notify_student_interview_scheduled(student, job, interview):
     message = f"Interview Scheduled: {interview_type} interview for {job_title} at {company_name} on {formatted_date} at {formatted_time}. Location: {interview_location}. Log in to CareerBridge for details."
     
     # Send the SMS
-    return send_sms(to_number, message)
+    return send_sms(to_number, message, notification_id)
 
 
-def notify_student_interview_result(student, job, interview):
+def notify_student_interview_result(student, job, interview, notification_id=None):
     """
     Send an SMS notification to a student when an interview result is updated.
     
@@ -208,9 +388,10 @@ def notify_student_interview_result(student, job, interview):
         student (dict): The student document from the database
         job (dict): The job document from the database
         interview (dict): The interview document from the database
+        notification_id: The in-app notification this SMS accompanies
         
     Returns:
-        bool: True if the notification was sent successfully, False otherwise
+        bool: True if the notification was queued, False otherwise
     """
     if not student.get('phone'):
         error_msg = f"Cannot send SMS notification: Student {student.get('_id')} has no phone number"
@@ -235,4 +416,21 @@ def notify_student_interview_result(student, job, interview):
         message = f"Interview Result: Your interview for {job_title} at {company_name} has been completed. Please log in to CareerBridge to check the details."
     
     # Send the SMS
-    return send_sms(to_number, message)
+    return send_sms(to_number, message, notification_id)
+
+
+def init_app(app):
+    """Register the background SMS delivery queue."""
+    twilio_enabled = os.environ.get('TWILIO_ENABLED', 'False').lower() in ('true', '1', 't')
+    app.config.setdefault('SMS_TRANSPORT', os.getenv('SMS_TRANSPORT', 'twilio' if twilio_enabled else 'disabled'))
+    app.config.setdefault('SMS_MAX_RETRIES', 4)
+    app.config.setdefault('SMS_RETRY_BACKOFF', 5.0)
+    # Room for a full bulk status update (applications.BULK_STATUS_LIMIT) and then some
+    app.config.setdefault('SMS_QUEUE_SIZE', int(os.getenv('SMS_QUEUE_SIZE', 2000)))
+    
+    app.extensions['sms_transport'] = create_transport(app)
+    register_queue(app, SMS_QUEUE, deliver_sms, workers=1,
+                   maxsize=app.config['SMS_QUEUE_SIZE'],
+                   max_retries=app.config['SMS_MAX_RETRIES'],
+                   backoff=app.config['SMS_RETRY_BACKOFF'],
+                   on_failure=dead_letter_sms)
@@ -7,8 +7,10 @@ import datetime
 import os
 import uuid
 from flask import Blueprint, flash, g, redirect, render_template, request, url_for, send_from_directory
-from flaskr.auth import login_required, student_required, recruiter_required
+from flaskr.auth import invalidate_user, login_required, public_endpoint, student_required, recruiter_required
 from flaskr.db import get_db
+from flaskr.ingestion import queue_resume_ingestion
+from flaskr.summary_cache import hash_file, invalidate_student
 
 bp = Blueprint('profile', __name__, url_prefix='/profile')
 
@@ -332,6 +334,13 @@ def student_profile():
                         update_data['resume_url'] = unique_filename
                         update_data['resume_filename'] = filename
                         update_data['resume_updated_at'] = datetime.datetime.now()
+                        update_data['resume_sha256'] = hash_file(file_path)
+                        # Text of the old resume is replaced by the ingestion task below
+                        update_data['resume_text'] = None
+                        update_data['resume_extraction'] = None
+                        
+                        # Summaries of the previous resume no longer apply
+                        invalidate_student(ObjectId(student['_id']))
                     
                     # Handle profile photo upload if provided
                     if profile_photo and profile_photo.filename != '':
@@ -353,6 +362,12 @@ def student_profile():
                         {'_id': ObjectId(student['_id'])},
                         {'$set': update_data}
                     )
+                    invalidate_user('student', student['_id'])
+                    
+                    # Extract the new resume's text once, in the background
+                    if 'resume_url' in update_data:
+                        queue_resume_ingestion(student['_id'], update_data['resume_url'],
+                                               os.path.join(RESUME_FOLDER, update_data['resume_url']))
                     
                     # Update the session user data
                     g.user.update(update_data)
@@ -496,6 +511,7 @@ def recruiter_profile():
                         {'_id': ObjectId(recruiter['_id'])},
                         {'$set': update_data}
                     )
+                    invalidate_user('recruiter', recruiter['_id'])
                     
                     # Update the session user data
                     g.user.update(update_data)
@@ -533,6 +549,7 @@ def recruiter_profile():
     return render_template('prof/recruiter_profile.html', recruiter=recruiter)
 
 @bp.route('/profile-photo/<filename>')
+@public_endpoint
 def profile_photo(filename):
     """Serve profile photos"""
     return send_from_directory(PROFILE_PHOTOS_FOLDER, filename)
\ No newline at end of file
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from bson import json_util
+from flask import current_app, g, has_app_context, request
+from flask.logging import default_handler
+from pymongo import monitoring
+
+# How many recent requests / slow queries to keep for the admin performance page
+RECENT_REQUEST_LIMIT = 200
+SLOW_QUERY_LIMIT = 100
+SLOWEST_PER_REQUEST = 5
+
+_recent_requests = deque(maxlen=RECENT_REQUEST_LIMIT)
+_slow_queries = deque(maxlen=SLOW_QUERY_LIMIT)
+_history_lock = threading.Lock()
+
+# Per-request query summaries go to their own logger: Flask's app logger only
+# passes warnings outside debug mode, and these are logged at info
+query_logger = logging.getLogger('flaskr.queries')
+
+
+class RequestQueryStats:
+    """Database activity recorded while handling a single request."""
+
+    def __init__(self, endpoint, slow_ms):
+        self.endpoint = endpoint
+        self.slow_ms = slow_ms
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest = []
+        self.pending = {}
+        self.started_at = time.perf_counter()
+
+    def record(self, command_name, collection, duration_ms, command):
+        self.count += 1
+        self.total_ms += duration_ms
+        entry = {
+            'command': command_name,
+            'collection': collection,
+            'duration_ms': round(duration_ms, 2),
+        }
+        self.slowest.append(entry)
+        self.slowest.sort(key=lambda q: q['duration_ms'], reverse=True)
+        del self.slowest[SLOWEST_PER_REQUEST:]
+
+        if duration_ms >= self.slow_ms:
+            _log_slow_query(self.endpoint, entry, command)
+
+
+def _command_filter(command_name, command):
+    """Pull the part of a command that describes what it matched on."""
+    if command is None:
+        return None
+    for key in ('filter', 'query', 'pipeline'):
+        if key in command:
+            return command[key]
+    if command_name in ('update', 'delete'):
+        statements = command.get('updates') or command.get('deletes') or []
+        return [statement.get('q') for statement in statements]
+    return None
+
+
+def _log_slow_query(endpoint, entry, command):
+    query_filter = _command_filter(entry['command'], command)
+    slow_entry = dict(entry,
+                      endpoint=endpoint,
+                      filter=json_util.dumps(query_filter),
+                      timestamp=datetime.now())
+    with _history_lock:
+        _slow_queries.appendleft(slow_entry)
+    current_app.logger.warning(
+        f"Slow query ({entry['duration_ms']}ms) in {endpoint}: "
+        f"{entry['command']} on {entry['collection']} filter={slow_entry['filter']}"
+    )
+
+
+def _current_stats():
+    if not has_app_context():
+        return None
+    return g.get('query_stats')
+
+
+class QueryListener(monitoring.CommandListener):
+    """pymongo command listener that feeds the per-request query stats.
+
+    pymongo publishes command events on the thread that ran the command, so
+    events can be attributed to the request being served on that thread.
+    """
+
+    def started(self, event):
+        stats = _current_stats()
+        if stats is None:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = None
+        stats.pending[event.request_id] = (collection, event.command)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        stats = _current_stats()
+        if stats is None:
+            return
+        collection, command = stats.pending.pop(event.request_id, (None, None))
+        stats.record(event.command_name, collection, event.duration_micros / 1000.0, command)
+
+
+listener = QueryListener()
+
+
+def start_request_profiling():
+    if not current_app.config['QUERY_PROFILING']:
+        return
+    g.query_stats = RequestQueryStats(request.endpoint, current_app.config['SLOW_QUERY_MS'])
+
+
+def finish_request_profiling(response):
+    stats = g.pop('query_stats', None)
+    if stats is None:
+        return response
+
+    elapsed_ms = (time.perf_counter() - stats.started_at) * 1000.0
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"'
+    )
+    response.headers.add('Server-Timing', f'app;dur={elapsed_ms:.2f}')
+
+    summary = {
+        'event': 'request_queries',
+        'endpoint': stats.endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'queries': stats.count,
+        'db_ms': round(stats.total_ms, 2),
+        'total_ms': round(elapsed_ms, 2),
+        'slowest': stats.slowest,
+    }
+    query_logger.info(json.dumps(summary))
+
+    with _history_lock:
+        _recent_requests.appendleft(dict(summary, timestamp=datetime.now()))
+    return response
+
+
+def get_recent_requests():
+    with _history_lock:
+        return list(_recent_requests)
+
+
+def get_slow_queries():
+    with _history_lock:
+        return list(_slow_queries)
+
+
+def get_endpoint_summary():
+    """Aggregate the recent request history per endpoint, worst first."""
+    endpoints = {}
+    for entry in get_recent_requests():
+        summary = endpoints.setdefault(entry['endpoint'], {
+            'endpoint': entry['endpoint'],
+            'requests': 0,
+            'queries': 0,
+            'db_ms': 0.0,
+            'max_queries': 0,
+        })
+        summary['requests'] += 1
+        summary['queries'] += entry['queries']
+        summary['db_ms'] += entry['db_ms']
+        summary['max_queries'] = max(summary['max_queries'], entry['queries'])
+
+    for summary in endpoints.values():
+        summary['avg_queries'] = round(summary['queries'] / summary['requests'], 1)
+        summary['avg_db_ms'] = round(summary['db_ms'] / summary['requests'], 2)
+    return sorted(endpoints.values(), key=lambda s: s['avg_db_ms'], reverse=True)
+
+
+def init_app(app):
+    """Register the query profiler with the Flask app."""
+    app.config.setdefault('QUERY_PROFILING', True)
+    app.config.setdefault('SLOW_QUERY_MS', 100)
+    # Level of the per-request summaries; set to WARNING to silence them
+    app.config.setdefault('QUERY_LOG_LEVEL', os.getenv('QUERY_LOG_LEVEL', 'INFO'))
+
+    query_logger.setLevel(app.config['QUERY_LOG_LEVEL'])
+    if not query_logger.handlers:
+        query_logger.addHandler(default_handler)
+
+    app.before_request(start_request_profiling)
+    app.after_request(finish_request_profiling)
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+from pymongo import UpdateOne
+
+from flaskr.db import get_db
+
+# Collection holding the counters of the Mongo rate limit store; a TTL index
+# on expire_at removes buckets once they can no longer be counted
+RATE_LIMIT_COLLECTION = 'rate_limits'
+
+# Counters kept by the in-memory store before expired ones are swept out
+MEMORY_STORE_LIMIT = 10000
+
+
+class MemoryRateLimitStore:
+    """Keeps counters in this process. Suitable for a single worker and for tests."""
+
+    def __init__(self, limit=MEMORY_STORE_LIMIT):
+        self.limit = limit
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def increment(self, counter_ids, expire_at):
+        with self._lock:
+            for counter_id in counter_ids:
+                count = self._counts.get(counter_id, (0, expire_at))[0]
+                self._counts[counter_id] = (count + 1, expire_at)
+            if len(self._counts) > self.limit:
+                now = time.time()
+                self._counts = {counter_id: entry for counter_id, entry in self._counts.items()
+                                if entry[1] > now}
+
+    def get_counts(self, counter_ids):
+        now = time.time()
+        with self._lock:
+            entries = {counter_id: self._counts.get(counter_id) for counter_id in counter_ids}
+        return {counter_id: entry[0] for counter_id, entry in entries.items()
+                if entry is not None and entry[1] > now}
+
+
+class MongoRateLimitStore:
+    """Keeps counters in the rate_limits collection, shared by every worker and instance."""
+
+    collection = RATE_LIMIT_COLLECTION
+
+    def increment(self, counter_ids, expire_at):
+        expires = datetime.fromtimestamp(expire_at, timezone.utc)
+        get_db()[self.collection].bulk_write([
+            UpdateOne({'_id': counter_id},
+                      {'$inc': {'count': 1}, '$setOnInsert': {'expire_at': expires}},
+                      upsert=True)
+            for counter_id in counter_ids
+        ], ordered=False)
+
+    def get_counts(self, counter_ids):
+        return {doc['_id']: doc['count']
+                for doc in get_db()[self.collection].find({'_id': {'$in': list(counter_ids)}})}
+
+
+class SlidingWindowLimiter:
+    """Counts events per key over a sliding window using two fixed buckets.
+
+    Each key has one counter per window-sized bucket. The count over the last
+    window is the current bucket plus the previous bucket weighted by how much
+    of it still overlaps the window, so checking a key reads two counters no
+    matter how many events it has seen.
+    """
+
+    def __init__(self, store, window):
+        self.store = store
+        self.window = window
+
+    def _buckets(self, now):
+        current = int(now // self.window)
+        overlap = 1.0 - (now % self.window) / self.window
+        return current, overlap
+
+    def counts(self, keys):
+        """Return the approximate number of events for each key within the last window."""
+        current, overlap = self._buckets(time.time())
+        stored = self.store.get_counts(
+            [f'{key}:{bucket}' for key in keys for bucket in (current, current - 1)])
+        return {key: stored.get(f'{key}:{current}', 0) + stored.get(f'{key}:{current - 1}', 0) * overlap
+                for key in keys}
+
+    def exceeded(self, limits):
+        """Whether any key in {key: limit} has reached its limit."""
+        counts = self.counts(list(limits))
+        return any(counts[key] >= limit for key, limit in limits.items())
+
+    def hit(self, keys):
+        """Record one event for each key."""
+        current, _ = self._buckets(time.time())
+        # A bucket is still read while it is the previous one, so it lives two windows
+        self.store.increment([f'{key}:{current}' for key in keys],
+                             expire_at=(current + 2) * self.window)
+
+
+def create_store(app):
+    if app.config['RATE_LIMIT_STORE'] == 'memory':
+        return MemoryRateLimitStore()
+    return MongoRateLimitStore()
+
+
+def get_login_limiter():
+    return current_app.extensions['login_limiter']
+
+
+def init_app(app):
+    """Configure the login rate limiter for the Flask app."""
+    app.config.setdefault('RATE_LIMIT_STORE', os.getenv('RATE_LIMIT_STORE', 'mongo'))
+    # Failed logins allowed per email address, and per client IP, in the window
+    app.config.setdefault('LOGIN_ATTEMPT_LIMIT', 5)
+    app.config.setdefault('LOGIN_IP_ATTEMPT_LIMIT', int(os.getenv('LOGIN_IP_ATTEMPT_LIMIT', 50)))
+    app.config.setdefault('LOGIN_ATTEMPT_WINDOW', 60)
+
+    app.extensions['login_limiter'] = SlidingWindowLimiter(create_store(app), app.config['LOGIN_ATTEMPT_WINDOW'])
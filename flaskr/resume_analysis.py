@@ -0,0 +1,348 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from flask import current_app
+
+from flaskr import summary_cache
+from flaskr.db import get_db
+from flaskr.ingestion import get_resume_text
+from flaskr.profile import RESUME_FOLDER
+from flaskr.summary_cache import get_summary, hash_file, store_summary, summary_key
+from flaskr.summary_prompt import SUMMARY_FALLBACKS, SUMMARY_FIELDS, build_summary_prompt, parse_summary
+from flaskr.tasks import RetryableError, register_queue, report_progress
+
+# Name of the background queue that runs resume analyses
+RESUME_ANALYSIS_QUEUE = 'resume_analysis'
+RESUME_BATCH_QUEUE = 'resume_batch'
+
+PRIMARY_MODEL = "models/gemini-1.5-flash"
+FALLBACK_MODEL = "models/gemini-1.5-pro"
+
+# Ask Gemini for a bare JSON object instead of prose around one. Older SDKs
+# (such as the pinned 0.3.x) have no JSON mode; the prompt and parser cope.
+JSON_RESPONSE_CONFIG = {'response_mime_type': 'application/json'}
+
+# Student fields needed to locate, key and read a resume
+RESUME_FIELDS = {'resume_url': 1, 'resume_sha256': 1, 'resume_text': 1, 'resume_extraction': 1}
+
+# Bump whenever the prompt in generate_resume_summary or the processing of
+# its output changes so cached summaries produced the old way stop matching
+PROMPT_VERSION = 4
+
+# Configure Google Gemini API
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', "your gemi api key here")
+
+# The Gemini SDK takes about a second to import, so it is loaded and
+# configured on first use instead of on every cold start
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def load_genai():
+    """Import and configure the Gemini SDK once per process."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=GEMINI_API_KEY)
+                _genai = genai
+    return _genai
+
+
+def json_mode_supported():
+    return 'response_mime_type' in getattr(load_genai().types.GenerationConfig, '__annotations__', {})
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Offline stand-in for Gemini, selected with RESUME_MODEL_BACKEND = 'stub'.
+
+    Returns a deterministic summary so the analysis pipeline can be exercised
+    in tests and local development without network access or an API key.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, generation_config=None):
+        return StubResponse(json.dumps({
+            "candidate_summary": f"<p>Stub summary from {self.model_name} ({len(prompt)} prompt characters).</p>",
+            "key_skills": "<ul><li>Stub skill</li></ul>",
+            "job_fit": "<p>Stub job fit analysis.</p>"
+        }))
+
+
+class RateLimiter:
+    """Spaces out calls so no more than a given number start per minute in this process."""
+
+    def __init__(self):
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, per_minute):
+        if not per_minute:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 60.0 / per_minute
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_model_rate_limiter = RateLimiter()
+
+
+def generate_content(model, prompt):
+    """Call the model for a JSON response, respecting the provider rate limit (RESUME_MODEL_RATE_LIMIT per minute)."""
+    _model_rate_limiter.wait(current_app.config.get('RESUME_MODEL_RATE_LIMIT'))
+    if isinstance(model, StubModel) or not json_mode_supported():
+        return model.generate_content(prompt)
+    return model.generate_content(prompt, generation_config=JSON_RESPONSE_CONFIG)
+
+
+def get_model(model_name):
+    """Return the generative model used for resume analysis."""
+    if current_app.config.get('RESUME_MODEL_BACKEND') == 'stub':
+        return StubModel(model_name)
+    return load_genai().GenerativeModel(model_name)
+
+
+def summary_model_name(model_name=PRIMARY_MODEL):
+    """Name of a summary model as recorded in the summary cache."""
+    return f"{current_app.config.get('RESUME_MODEL_BACKEND')}:{model_name}"
+
+
+def resume_cache_key(student, job_id):
+    """Summary cache key for a student's current resume and a job.
+
+    Uses the hash recorded at upload; resumes uploaded before hashes were
+    recorded are hashed from disk once, and the hash is saved on the student
+    so later requests can answer from the cache without queueing a task.
+    """
+    resume_hash = student.get('resume_sha256')
+    if not resume_hash:
+        resume_hash = hash_file(os.path.join(RESUME_FOLDER, student['resume_url']))
+        # Only if the resume was not replaced in the meantime
+        get_db()['students'].update_one(
+            {'_id': student['_id'], 'resume_url': student['resume_url'], 'resume_sha256': None},
+            {'$set': {'resume_sha256': resume_hash}}
+        )
+    return resume_hash, summary_key(resume_hash, job_id, PROMPT_VERSION, summary_model_name())
+
+
+def request_summary(model_name, prompt, fields):
+    """Ask a model for summary fields as JSON; returns (valid sections, missing field names)."""
+    response = generate_content(get_model(model_name), prompt)
+    return parse_summary(response.text, fields)
+
+
+def generate_resume_summary(text, job_title=None, job_description=None):
+    """Generate a summary of the resume using Google Gemini API.
+
+    Returns (summary, name of the model that wrote it, or None when no model was asked).
+    """
+    if not text.strip():
+        return {
+            "candidate_summary": "<p>No text content could be extracted from the resume.</p>",
+            "key_skills": "<p>No skills could be identified.</p>",
+            "job_fit": "<p>Unable to analyze job fit due to missing resume content.</p>"
+        }, None
+    
+    config = current_app.config
+    budgets = {'resume_tokens': config['SUMMARY_RESUME_TOKENS'], 'job_tokens': config['SUMMARY_JOB_TOKENS']}
+    fields = list(SUMMARY_FIELDS)
+    prompt = build_summary_prompt(text, job_title, job_description, fields, **budgets)
+    
+    model_name = PRIMARY_MODEL
+    try:
+        summary, missing = request_summary(model_name, prompt, fields)
+    except Exception as e:
+        current_app.logger.warning(f"Error generating summary: {str(e)}")
+        # The fallback model is only for when the primary one cannot be reached
+        model_name = FALLBACK_MODEL
+        try:
+            summary, missing = request_summary(model_name, prompt, fields)
+        except Exception as fallback_e:
+            # Both models failed; let the task queue retry the analysis later
+            error_message = f"Error generating summary with primary model: {str(e)}\n\nError with fallback model: {str(fallback_e)}"
+            raise RetryableError(error_message)
+    
+    # Ask again only for the sections that came back missing or malformed
+    for _ in range(config['SUMMARY_REPAIR_ATTEMPTS']):
+        if not missing:
+            break
+        current_app.logger.info(f"Regenerating summary sections: {', '.join(missing)}")
+        repair_prompt = build_summary_prompt(text, job_title, job_description, missing, **budgets)
+        try:
+            repaired, missing = request_summary(model_name, repair_prompt, missing)
+        except Exception as e:
+            current_app.logger.warning(f"Error regenerating summary sections: {str(e)}")
+            break
+        summary.update(repaired)
+    
+    for field in missing:
+        summary[field] = SUMMARY_FALLBACKS[field]
+    return summary, model_name
+
+
+def is_degraded(summary):
+    """Whether any section of a summary is a placeholder instead of model output."""
+    return any(summary.get(field) == SUMMARY_FALLBACKS[field] for field in SUMMARY_FIELDS)
+
+
+def summarize_resume(student, job, refresh=False):
+    """Summarize a student's current resume for a job, going through the summary cache.
+
+    Returns (cache key, summary, whether it came from the cache).
+    """
+    resume_path = os.path.join(RESUME_FOLDER, student['resume_url'])
+    if not os.path.exists(resume_path):
+        raise ValueError('Resume file not found')
+    
+    # The same resume summarized for the same job needs no new extraction or model call
+    resume_hash, cache_key = resume_cache_key(student, job['_id'])
+    if not refresh:
+        cached = get_summary(cache_key)
+        if cached is not None:
+            return cache_key, cached, True
+    
+    # Text is extracted once at upload; older resumes are extracted here on first use
+    text_content = get_resume_text(student, resume_path)
+    
+    # Generate summary using the extracted text
+    summary, model_name = generate_resume_summary(
+        text_content, 
+        job_title=job.get('title'), 
+        job_description=job.get('description')
+    )
+    # A summary of an unreadable resume, or with sections the model never
+    # produced, is shown but not cached, so the next request tries again.
+    # Lookups always use the primary model's key; the entry records the model
+    # that actually answered, so fallback summaries can be told apart.
+    if model_name is not None and not is_degraded(summary):
+        store_summary(cache_key, summary, resume_hash, job['_id'], student['_id'],
+                      PROMPT_VERSION, summary_model_name(model_name))
+    return cache_key, summary, False
+
+
+def save_application_summary(db, application_ids, cache_key, summary):
+    """Keep a copy of the summary on the applications so list views can show it."""
+    db['applications'].update_many(
+        {'_id': {'$in': application_ids}},
+        {'$set': {'ai_summary': summary, 'ai_summary_key': cache_key, 'ai_summary_at': datetime.now()}}
+    )
+
+
+def analyze_application(payload):
+    """Task handler: extract the applicant's resume text and summarize it for the job."""
+    db = get_db()
+    
+    application = db['applications'].find_one({'_id': ObjectId(payload['application_id'])})
+    if application is None:
+        raise ValueError('Application not found')
+    
+    job = db['jobs'].find_one({'_id': application['job_id']}, {'title': 1, 'description': 1})
+    if job is None:
+        raise ValueError('Job not found')
+    
+    student = db['students'].find_one({'_id': application['student_id']}, RESUME_FIELDS)
+    if student is None or not student.get('resume_url'):
+        raise ValueError('Resume not found')
+    
+    cache_key, summary, _ = summarize_resume(student, job, refresh=payload.get('refresh'))
+    save_application_summary(db, [application['_id']], cache_key, summary)
+    return summary
+
+
+def _summarize_group(app, job, student, application_ids, refresh):
+    """Batch worker: summarize one distinct resume and store it on its applications."""
+    with app.app_context():
+        cache_key, summary, cached = summarize_resume(student, job, refresh=refresh)
+        save_application_summary(get_db(), application_ids, cache_key, summary)
+        return cached
+
+
+def analyze_job_applicants(payload):
+    """Task handler: summarize every applicant of a job on a bounded thread pool.
+
+    Applications sharing a resume are summarized once, and resumes already in
+    the summary cache skip the model entirely.
+    """
+    db = get_db()
+    job_id = ObjectId(payload['job_id'])
+    job = db['jobs'].find_one({'_id': job_id}, {'title': 1, 'description': 1})
+    if job is None:
+        raise ValueError('Job not found')
+    
+    applications = list(db['applications'].find({'job_id': job_id}, {'student_id': 1}))
+    student_ids = list({application['student_id'] for application in applications})
+    students = {student['_id']: student
+                for student in db['students'].find({'_id': {'$in': student_ids}}, RESUME_FIELDS)}
+    
+    progress = {'total': len(applications), 'completed': 0, 'cached': 0, 'failed': 0}
+    
+    # Group applications by summary cache key so identical resumes are analyzed once
+    groups = {}
+    for application in applications:
+        student = students.get(application['student_id'])
+        if student is None or not student.get('resume_url'):
+            progress['failed'] += 1
+            continue
+        try:
+            _, cache_key = resume_cache_key(student, job_id)
+        except OSError:
+            progress['failed'] += 1
+            continue
+        group = groups.setdefault(cache_key, {'student': student, 'application_ids': []})
+        group['application_ids'].append(application['_id'])
+    report_progress(**progress)
+    
+    app = current_app._get_current_object()
+    workers = current_app.config['RESUME_BATCH_CONCURRENCY']
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resume-batch') as executor:
+        futures = {
+            executor.submit(_summarize_group, app, job, group['student'], group['application_ids'],
+                            payload.get('refresh')): len(group['application_ids'])
+            for group in groups.values()
+        }
+        for future in as_completed(futures):
+            count = futures[future]
+            try:
+                cached = future.result()
+            except Exception as e:
+                current_app.logger.warning(f'Batch resume analysis failed for job {job_id}: {e}')
+                progress['failed'] += count
+            else:
+                progress['completed'] += count
+                if cached:
+                    progress['cached'] += count
+            report_progress(**progress)
+    
+    return progress
+
+
+def init_app(app):
+    """Register the background resume analysis queues."""
+    app.config.setdefault('RESUME_MODEL_BACKEND', os.getenv('RESUME_MODEL_BACKEND', 'gemini'))
+    # Applicant resumes analyzed at once by a batch, and model calls allowed per minute (0 = unlimited)
+    app.config.setdefault('RESUME_BATCH_CONCURRENCY', int(os.getenv('RESUME_BATCH_CONCURRENCY', 4)))
+    app.config.setdefault('RESUME_MODEL_RATE_LIMIT', int(os.getenv('RESUME_MODEL_RATE_LIMIT', 60)))
+    # Prompt token budgets per section, and follow-up calls for sections the model got wrong
+    app.config.setdefault('SUMMARY_RESUME_TOKENS', 3000)
+    app.config.setdefault('SUMMARY_JOB_TOKENS', 600)
+    app.config.setdefault('SUMMARY_REPAIR_ATTEMPTS', 1)
+    summary_cache.init_app(app)
+    register_queue(app, RESUME_ANALYSIS_QUEUE, analyze_application)
+    # A batch fans out on its own thread pool, so one batch runs at a time per process
+    register_queue(app, RESUME_BATCH_QUEUE, analyze_job_applicants, workers=1, max_retries=0)
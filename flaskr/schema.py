@@ -0,0 +1,203 @@
+import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from pymongo import ASCENDING, DESCENDING, IndexModel, TEXT
+
+from flaskr.db import get_db
+from flaskr.extraction import OCR_CACHE_COLLECTION, OCR_CACHE_MAX_AGE
+from flaskr.ratelimit import RATE_LIMIT_COLLECTION
+from flaskr.summary_cache import SUMMARY_CACHE_MAX_AGE, SUMMARY_COLLECTION
+
+# Single document recording which migrations have been applied
+SCHEMA_COLLECTION = 'schema_version'
+SCHEMA_DOC_ID = 'schema'
+
+
+def declared_indexes(config):
+    """Every index the application relies on, by collection."""
+    return {
+        'students': [
+            IndexModel([('email', ASCENDING)], unique=True),
+            IndexModel([('username', ASCENDING)], unique=True),
+            IndexModel([('phone', ASCENDING)], unique=True, sparse=True),
+            IndexModel([('email', ASCENDING), ('password', ASCENDING)]),
+        ],
+        'recruiters': [
+            IndexModel([('email', ASCENDING)], unique=True),
+            IndexModel([('username', ASCENDING)], unique=True),
+            IndexModel([('phone', ASCENDING)], unique=True, sparse=True),
+            IndexModel([('company_name', ASCENDING)]),
+            IndexModel([('email', ASCENDING), ('password', ASCENDING)]),
+        ],
+        'jobs': [
+            # Keyset pagination on the job board
+            IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)]),
+            # Eligible-only job board for students (see jobs.eligibility_query)
+            IndexModel([('eligible_branches', ASCENDING), ('min_cgpa', ASCENDING), ('created_at', DESCENDING)]),
+            # Full-text search over job listings (see jobs.search)
+            IndexModel(
+                [('title', TEXT), ('description', TEXT), ('company_name', TEXT), ('location', TEXT)],
+                weights={'title': 10, 'company_name': 5, 'location': 3, 'description': 1},
+                name='job_search'
+            ),
+        ],
+        'applications': [
+            IndexModel([('job_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]),
+            IndexModel([('student_id', ASCENDING), ('created_at', DESCENDING)]),
+        ],
+        'interviews': [
+            IndexModel([('student_id', ASCENDING), ('interview_datetime', ASCENDING)]),
+            IndexModel([('recruiter_id', ASCENDING), ('interview_datetime', ASCENDING)]),
+        ],
+        # Background task state expires a day after the task was queued
+        'tasks': [
+            IndexModel([('created_at', ASCENDING)], expireAfterSeconds=86400),
+        ],
+        # Cached resume summaries expire by age; student_id serves invalidation
+        # on upload and last_used_at the size-based eviction
+        SUMMARY_COLLECTION: [
+            IndexModel([('created_at', ASCENDING)],
+                       expireAfterSeconds=config.get('SUMMARY_CACHE_MAX_AGE', SUMMARY_CACHE_MAX_AGE)),
+            IndexModel([('student_id', ASCENDING)]),
+            IndexModel([('last_used_at', ASCENDING)]),
+        ],
+        # OCR output cached by image hash
+        OCR_CACHE_COLLECTION: [
+            IndexModel([('created_at', ASCENDING)],
+                       expireAfterSeconds=config.get('OCR_CACHE_MAX_AGE', OCR_CACHE_MAX_AGE)),
+        ],
+        # Login rate limit buckets carry their own expiry time
+        RATE_LIMIT_COLLECTION: [
+            IndexModel([('expire_at', ASCENDING)], expireAfterSeconds=0),
+        ],
+    }
+
+
+def sync_indexes(db, declared, prune=False):
+    """Bring the database's indexes in line with the declared ones.
+
+    Missing indexes are created and changed TTLs updated in place. Indexes
+    that are not declared are reported, and dropped only when prune is set.
+    Returns a description of every change made or needed.
+    """
+    changes = []
+    for collection, models in declared.items():
+        existing = {index['name']: index for index in db[collection].list_indexes()}
+        missing = []
+        for model in models:
+            spec = model.document
+            current = existing.get(spec['name'])
+            if current is None:
+                missing.append(model)
+            elif 'expireAfterSeconds' in spec and current.get('expireAfterSeconds') != spec['expireAfterSeconds']:
+                db.command('collMod', collection,
+                           index={'name': spec['name'], 'expireAfterSeconds': spec['expireAfterSeconds']})
+                changes.append(f"{collection}: set TTL of {spec['name']} to {spec['expireAfterSeconds']}s")
+        if missing:
+            db[collection].create_indexes(missing)
+            changes.extend(f"{collection}: created {model.document['name']}" for model in missing)
+
+        declared_names = {model.document['name'] for model in models} | {'_id_'}
+        for name in sorted(set(existing) - declared_names):
+            if prune:
+                db[collection].drop_index(name)
+                changes.append(f'{collection}: dropped {name}')
+            else:
+                changes.append(f'{collection}: {name} is not declared (use --prune to drop it)')
+    return changes
+
+
+def bootstrap_admin(db):
+    """Promote the earliest registered user to admin when no admin exists yet.
+
+    Not a migration: init-db may run before anyone has registered, so this is
+    retried on every run until there is an admin. Returns a description of
+    the promotion, or None.
+    """
+    if db['students'].find_one({'is_admin': True}) or db['recruiters'].find_one({'is_admin': True}):
+        return None
+
+    candidates = []
+    for collection, user_type in (('students', 'Student'), ('recruiters', 'Recruiter')):
+        first_user = db[collection].find_one({}, sort=[('created_at', 1)])
+        if first_user:
+            candidates.append((first_user.get('created_at', datetime.datetime.max), collection, user_type, first_user))
+    if not candidates:
+        return None
+
+    # A student wins a tie, as before
+    _, collection, user_type, first_user = min(candidates, key=lambda candidate: candidate[0])
+    db[collection].update_one({'_id': first_user['_id']}, {'$set': {'is_admin': True}})
+    message = f'{user_type} {first_user.get("email")} automatically promoted to admin as first user'
+    current_app.logger.info(f'ADMIN_CREATION: {message}')
+    return message
+
+
+def backfill_job_created_at(db):
+    """Date jobs saved without created_at by their ObjectId, so they page and sort with the rest."""
+    db['jobs'].update_many({'created_at': None}, [{'$set': {'created_at': {'$toDate': '$_id'}}}])
+
+
+# One-off data changes, applied in order and each only once per database.
+# Append new migrations with the next version number; never renumber.
+MIGRATIONS = [
+    (1, 'date jobs without created_at by their ObjectId', backfill_job_created_at),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def applied_version(db):
+    doc = db[SCHEMA_COLLECTION].find_one({'_id': SCHEMA_DOC_ID})
+    return doc['version'] if doc else 0
+
+
+def migrate(db):
+    """Apply the migrations newer than the database's schema version; return their descriptions."""
+    applied = []
+    current = applied_version(db)
+    for version, description, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        migration(db)
+        db[SCHEMA_COLLECTION].update_one(
+            {'_id': SCHEMA_DOC_ID},
+            {'$set': {'version': version, 'updated_at': datetime.datetime.now()},
+             '$push': {'history': {'version': version, 'description': description,
+                                   'applied_at': datetime.datetime.now()}}},
+            upsert=True
+        )
+        applied.append(f'{version}: {description}')
+    return applied
+
+
+def init_db(app, prune=False):
+    """Sync indexes, apply pending migrations and make sure there is an admin.
+
+    Returns (index changes, applied migrations, admin promotion or None).
+    """
+    with app.app_context():
+        db = get_db()
+        return sync_indexes(db, declared_indexes(app.config), prune=prune), migrate(db), bootstrap_admin(db)
+
+
+@click.command('init-db')
+@click.option('--prune', is_flag=True, help='Drop indexes that are not declared.')
+@with_appcontext
+def init_db_command(prune):
+    """Create or update the database indexes, apply pending migrations and promote a first admin."""
+    index_changes, migrations, promotion = init_db(current_app._get_current_object(), prune=prune)
+    for change in index_changes:
+        click.echo(change)
+    for migration in migrations:
+        click.echo(f'Applied migration {migration}')
+    if promotion:
+        click.echo(promotion)
+    click.echo(f'Schema is at version {SCHEMA_VERSION}; {len(index_changes)} index change(s).')
+
+
+def init_app(app):
+    """Register the init-db command."""
+    app.cli.add_command(init_db_command)
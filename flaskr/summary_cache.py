@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from datetime import datetime
+
+from flask import current_app
+
+from flaskr.cache import TTLCache, register_stats
+from flaskr.db import get_db
+
+SUMMARY_COLLECTION = 'resume_summaries'
+
+# Defaults for the Mongo tier: summaries expire after 30 days, and only the
+# most recently used ones are kept beyond the entry limit
+SUMMARY_CACHE_MAX_AGE = 30 * 24 * 3600
+SUMMARY_CACHE_MAX_ENTRIES = 10000
+
+# Hot summaries are served from this process before asking Mongo
+_front_tier = TTLCache('resume_summaries', maxsize=256, ttl=3600)
+
+_store_counts = {'hits': 0, 'misses': 0}
+_store_lock = threading.Lock()
+
+
+def hash_file(path, chunk_size=64 * 1024):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def summary_key(resume_hash, job_id, prompt_version, model_name):
+    """Content address of a summary: same resume, job, prompt and model give the same key."""
+    raw = f'{resume_hash}:{job_id}:{prompt_version}:{model_name}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _count(outcome):
+    with _store_lock:
+        _store_counts[outcome] += 1
+
+
+def get_summary(key):
+    """Return a cached summary, checking the in-process tier before Mongo."""
+    summary = _front_tier.get(key)
+    if summary is not None:
+        return summary
+
+    doc = get_db()[SUMMARY_COLLECTION].find_one_and_update(
+        {'_id': key},
+        {'$set': {'last_used_at': datetime.now()}},
+        projection={'summary': 1}
+    )
+    if doc is None:
+        _count('misses')
+        return None
+
+    _count('hits')
+    _front_tier.set(key, doc['summary'])
+    return doc['summary']
+
+
+def store_summary(key, summary, resume_hash, job_id, student_id, prompt_version, model_name):
+    """Save a summary in both tiers and trim the Mongo tier to its size limit."""
+    now = datetime.now()
+    collection = get_db()[SUMMARY_COLLECTION]
+    collection.replace_one({'_id': key}, {
+        'resume_hash': resume_hash,
+        'job_id': job_id,
+        'student_id': student_id,
+        'prompt_version': prompt_version,
+        'model': model_name,
+        'summary': summary,
+        'created_at': now,
+        'last_used_at': now,
+    }, upsert=True)
+    _front_tier.set(key, summary)
+    _evict_over_limit(collection)
+
+
+def _evict_over_limit(collection):
+    """Drop the least recently used summaries beyond SUMMARY_CACHE_MAX_ENTRIES."""
+    max_entries = current_app.config['SUMMARY_CACHE_MAX_ENTRIES']
+    excess = collection.estimated_document_count() - max_entries
+    if excess <= 0:
+        return
+    stale = [doc['_id'] for doc in collection.find({}, {'_id': 1}).sort('last_used_at', 1).limit(excess)]
+    if stale:
+        collection.delete_many({'_id': {'$in': stale}})
+        for key in stale:
+            _front_tier.invalidate(key)
+
+
+def invalidate_student(student_id):
+    """Forget every cached summary of a student's resume, e.g. after a new upload."""
+    db = get_db()
+    collection = db[SUMMARY_COLLECTION]
+    keys = [doc['_id'] for doc in collection.find({'student_id': student_id}, {'_id': 1})]
+    if keys:
+        collection.delete_many({'_id': {'$in': keys}})
+        for key in keys:
+            _front_tier.invalidate(key)
+    # Copies kept on the student's applications for the list view
+    db['applications'].update_many(
+        {'student_id': student_id, 'ai_summary': {'$exists': True}},
+        {'$unset': {'ai_summary': '', 'ai_summary_key': '', 'ai_summary_at': ''}}
+    )
+
+
+def _store_stats():
+    with _store_lock:
+        hits, misses = _store_counts['hits'], _store_counts['misses']
+    lookups = hits + misses
+    return {
+        'name': 'resume_summaries (mongo)',
+        'size': get_db()[SUMMARY_COLLECTION].estimated_document_count(),
+        'maxsize': current_app.config.get('SUMMARY_CACHE_MAX_ENTRIES', '-'),
+        'ttl': current_app.config.get('SUMMARY_CACHE_MAX_AGE', '-'),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups * 100, 1) if lookups else None,
+    }
+
+
+register_stats('resume_summaries_store', _store_stats)
+
+
+def init_app(app):
+    """Configure the resume summary cache."""
+    app.config.setdefault('SUMMARY_CACHE_MAX_ENTRIES', SUMMARY_CACHE_MAX_ENTRIES)
+    # Summaries older than this many seconds expire through a TTL index
+    app.config.setdefault('SUMMARY_CACHE_MAX_AGE', SUMMARY_CACHE_MAX_AGE)
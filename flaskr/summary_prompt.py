@@ -0,0 +1,127 @@
+import json
+from html import escape
+from html.parser import HTMLParser
+
+# Rough size of a token for English text; good enough for budgeting prompts
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = '\n[... truncated ...]'
+
+# Sections of a resume summary and what each should contain
+SUMMARY_FIELDS = {
+    'candidate_summary': "A brief overview of the candidate's background, experience, and qualifications.",
+    'key_skills': "A bullet-point list of the candidate's key skills and competencies.",
+    'job_fit': "An assessment of how well the candidate's profile matches the job requirements.",
+}
+
+# Shown for a section the model still failed to produce after a repair attempt
+SUMMARY_FALLBACKS = {
+    'candidate_summary': "<p>Candidate summary could not be generated.</p>",
+    'key_skills': "<p>Skills extraction failed.</p>",
+    'job_fit': "<p>Job fit analysis failed.</p>",
+}
+
+# Markup a summary may keep; everything else, attributes included, is dropped.
+# Summaries are written by a model reading student-uploaded resumes, so they
+# are untrusted and must never reach a page unsanitized.
+SUMMARY_ALLOWED_TAGS = {'p', 'ul', 'ol', 'li', 'strong', 'em', 'b', 'i', 'br'}
+SUMMARY_DROPPED_CONTENT = {'script', 'style'}
+
+
+class _SummarySanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SUMMARY_DROPPED_CONTENT:
+            self._skipping += 1
+        elif tag in SUMMARY_ALLOWED_TAGS and not self._skipping:
+            self.parts.append(f'<{tag}>')
+
+    def handle_endtag(self, tag):
+        if tag in SUMMARY_DROPPED_CONTENT:
+            self._skipping = max(self._skipping - 1, 0)
+        elif tag in SUMMARY_ALLOWED_TAGS and tag != 'br' and not self._skipping:
+            self.parts.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(escape(data))
+
+
+def sanitize_summary_html(html):
+    """Reduce summary HTML to SUMMARY_ALLOWED_TAGS without attributes, escaping all text."""
+    sanitizer = _SummarySanitizer()
+    sanitizer.feed(html or '')
+    sanitizer.close()
+    return ''.join(sanitizer.parts)
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def fit_to_budget(text, max_tokens):
+    """Trim text to about max_tokens, cutting at a line break where possible."""
+    text = (text or '').strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER)
+    cut = text.rfind('\n', 0, limit)
+    # Don't throw away more than a fifth of the budget just to end on a line
+    if cut < limit * 0.8:
+        cut = limit
+    return text[:cut].rstrip() + TRUNCATION_MARKER
+
+
+def build_summary_prompt(resume_text, job_title=None, job_description=None, fields=None,
+                         resume_tokens=3000, job_tokens=600):
+    """Prompt asking for the given summary fields as a JSON object, within a token budget."""
+    fields = fields or list(SUMMARY_FIELDS)
+
+    job_context = ""
+    if job_title and job_description:
+        job_context = (f"\nThe candidate has applied for the position of {job_title}.\n"
+                       f"Job Description:\n{fit_to_budget(job_description, job_tokens)}\n")
+
+    sections = "\n".join(f"- {field}: {SUMMARY_FIELDS[field]}" for field in fields)
+    structure = json.dumps({field: "HTML formatted text" for field in fields}, indent=2)
+
+    return f"""You are an expert HR professional analyzing a resume.
+Format each section in HTML with appropriate tags (<p>, <ul>, <li>, <strong>, etc.).
+
+Resume Content:
+{fit_to_budget(resume_text, resume_tokens)}
+{job_context}
+Provide the following sections:
+{sections}
+
+Respond with only a JSON object of this structure:
+{structure}
+"""
+
+
+def parse_summary(response_text, fields):
+    """Validate a model response against the summary schema.
+
+    Returns (valid sections, names of fields that are missing or malformed).
+    """
+    data = None
+    try:
+        data = json.loads(response_text)
+    except (TypeError, ValueError):
+        # Some responses wrap the object in prose or a code fence
+        start, end = (response_text or '').find('{'), (response_text or '').rfind('}') + 1
+        if 0 <= start < end:
+            try:
+                data = json.loads(response_text[start:end])
+            except ValueError:
+                data = None
+    if not isinstance(data, dict):
+        return {}, list(fields)
+
+    valid = {field: sanitize_summary_html(data[field]) for field in fields
+             if isinstance(data.get(field), str) and data[field].strip()}
+    return valid, [field for field in fields if field not in valid]
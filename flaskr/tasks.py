@@ -0,0 +1,260 @@
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+
+from flaskr.db import get_db
+
+# Task states as stored in the task store and returned to pollers
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# How many finished tasks the in-memory store remembers
+MEMORY_STORE_LIMIT = 1000
+
+# The task being run on each worker thread, for report_progress
+_running = threading.local()
+
+
+class QueueFull(Exception):
+    """Raised when a task queue is at capacity and cannot accept more work."""
+
+
+class RetryableError(Exception):
+    """Raised by a task handler when the task should be retried after a backoff."""
+
+
+class MemoryTaskStore:
+    """Keeps task state in this process. Suitable for a single worker and for tests."""
+
+    def __init__(self, limit=MEMORY_STORE_LIMIT):
+        self.limit = limit
+        self._tasks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, task):
+        with self._lock:
+            self._tasks[task['_id']] = dict(task)
+            while len(self._tasks) > self.limit:
+                self._tasks.popitem(last=False)
+
+    def create_many(self, tasks):
+        for task in tasks:
+            self.create(task)
+
+    def get(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+
+    def update(self, task_id, **fields):
+        with self._lock:
+            if task_id in self._tasks:
+                self._tasks[task_id].update(fields)
+
+
+class MongoTaskStore:
+    """Keeps task state in the tasks collection so any worker can answer a poll."""
+
+    collection = 'tasks'
+
+    def create(self, task):
+        get_db()[self.collection].insert_one(dict(task))
+
+    def create_many(self, tasks):
+        get_db()[self.collection].insert_many([dict(task) for task in tasks])
+
+    def get(self, task_id):
+        return get_db()[self.collection].find_one({'_id': task_id})
+
+    def update(self, task_id, **fields):
+        get_db()[self.collection].update_one({'_id': task_id}, {'$set': fields})
+
+
+class TaskQueue:
+    """A bounded queue of background tasks run by a pool of worker threads.
+
+    Worker threads start lazily on first submit, so a process that never
+    queues work (or a freshly forked child) does not carry idle threads.
+    Handlers run inside an app context and may raise RetryableError to be
+    retried with exponential backoff. on_failure(task_id, payload, error) is
+    called once a task has failed for good, e.g. to dead-letter it.
+    """
+
+    def __init__(self, app, name, handler, store, workers=2, maxsize=100,
+                 max_retries=3, backoff=2.0, on_failure=None):
+        self.app = app
+        self.name = name
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.on_failure = on_failure
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _new_task(self, payload, owner_id):
+        return {
+            '_id': uuid.uuid4().hex,
+            'queue': self.name,
+            'status': QUEUED,
+            'payload': payload,
+            'owner_id': owner_id,
+            'attempts': 0,
+            'result': None,
+            'error': None,
+            'created_at': datetime.now(),
+        }
+
+    def submit(self, payload, owner_id=None):
+        """Queue a task and return its id without waiting for it to run."""
+        self._ensure_workers()
+        task = self._new_task(payload, owner_id)
+        self.store.create(task)
+        try:
+            self._queue.put_nowait(task['_id'])
+        except queue.Full:
+            self.store.update(task['_id'], status=FAILED, error='Queue is full')
+            raise QueueFull(f'The {self.name} queue is full')
+        return task['_id']
+
+    def submit_many(self, payloads, owner_id=None):
+        """Queue several tasks with one store write.
+
+        Returns their ids in order, with None for any task the full queue rejected.
+        """
+        self._ensure_workers()
+        tasks = [self._new_task(payload, owner_id) for payload in payloads]
+        if tasks:
+            self.store.create_many(tasks)
+        task_ids = []
+        for task in tasks:
+            try:
+                self._queue.put_nowait(task['_id'])
+            except queue.Full:
+                self.store.update(task['_id'], status=FAILED, error='Queue is full')
+                task_ids.append(None)
+            else:
+                task_ids.append(task['_id'])
+        return task_ids
+
+    def get(self, task_id):
+        return self.store.get(task_id)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _ensure_workers(self):
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads and queued ids do not survive a fork
+                self._threads = []
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f'{self.name}-worker', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            task_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._run(task_id)
+            except Exception:
+                self.app.logger.error(f'{self.name} worker crashed on task {task_id}:\n{traceback.format_exc()}')
+            finally:
+                self._queue.task_done()
+
+    def _run(self, task_id):
+        task = self.store.get(task_id)
+        if task is None:
+            return
+
+        _running.task = (self.store, task_id)
+        try:
+            self._attempt(task_id, task['payload'])
+        finally:
+            _running.task = None
+
+    def _attempt(self, task_id, payload):
+        for attempt in range(1, self.max_retries + 2):
+            self.store.update(task_id, status=RUNNING, attempts=attempt, started_at=datetime.now())
+            try:
+                result = self.handler(payload)
+            except RetryableError as e:
+                if attempt > self.max_retries:
+                    self._fail(task_id, payload, str(e))
+                    return
+                delay = self.backoff * (2 ** (attempt - 1))
+                current_app.logger.warning(f'{self.name} task {task_id} failed ({e}); retrying in {delay}s')
+                self.store.update(task_id, status=QUEUED, error=str(e))
+                time.sleep(delay)
+            except Exception as e:
+                current_app.logger.error(f'{self.name} task {task_id} failed:\n{traceback.format_exc()}')
+                self._fail(task_id, payload, str(e))
+                return
+            else:
+                self.store.update(task_id, status=DONE, result=result, error=None, finished_at=datetime.now())
+                return
+
+    def _fail(self, task_id, payload, error):
+        self.store.update(task_id, status=FAILED, error=error, finished_at=datetime.now())
+        if self.on_failure is not None:
+            try:
+                self.on_failure(task_id, payload, error)
+            except Exception:
+                current_app.logger.error(f'{self.name} failure handler crashed on task {task_id}:\n{traceback.format_exc()}')
+
+
+def report_progress(**progress):
+    """Record progress of the task running on this thread, e.g. items done so far."""
+    running = getattr(_running, 'task', None)
+    if running is not None:
+        store, task_id = running
+        store.update(task_id, progress=progress)
+
+
+def create_store(app):
+    if app.config['TASK_STORE'] == 'memory':
+        return MemoryTaskStore()
+    return MongoTaskStore()
+
+
+def register_queue(app, name, handler, **options):
+    """Create a named task queue for the app, configured from TASK_* settings."""
+    options.setdefault('workers', app.config['TASK_WORKERS'])
+    options.setdefault('maxsize', app.config['TASK_QUEUE_SIZE'])
+    options.setdefault('max_retries', app.config['TASK_MAX_RETRIES'])
+    options.setdefault('backoff', app.config['TASK_RETRY_BACKOFF'])
+    task_queue = TaskQueue(app, name, handler, create_store(app), **options)
+    app.extensions.setdefault('task_queues', {})[name] = task_queue
+    return task_queue
+
+
+def get_queue(name):
+    return current_app.extensions['task_queues'][name]
+
+
+def init_app(app):
+    """Configure background task queues for the Flask app."""
+    app.config.setdefault('TASK_STORE', os.getenv('TASK_STORE', 'mongo'))
+    app.config.setdefault('TASK_WORKERS', int(os.getenv('TASK_WORKERS', 2)))
+    app.config.setdefault('TASK_QUEUE_SIZE', int(os.getenv('TASK_QUEUE_SIZE', 100)))
+    app.config.setdefault('TASK_MAX_RETRIES', 2)
+    app.config.setdefault('TASK_RETRY_BACKOFF', 2.0)
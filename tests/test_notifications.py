@@ -0,0 +1,29 @@
+from flaskr import create_app
+from flaskr.applications import BULK_STATUS_LIMIT
+from flaskr.notifications import SMS_QUEUED, SMS_QUEUE, send_sms_batch
+from flaskr.tasks import get_queue
+
+
+def make_app():
+    # Startup makes no database calls, and messages without a notification
+    # id never touch the database, so no MongoDB is needed
+    return create_app({
+        'TESTING': True,
+        'MONGO_URI': 'mongodb://localhost:27017/test',
+        'TASK_STORE': 'memory',
+        'SMS_TRANSPORT': 'fake',
+    })
+
+
+def test_sms_queue_takes_a_full_bulk_update():
+    app = make_app()
+    with app.app_context():
+        assert get_queue(SMS_QUEUE)._queue.maxsize >= BULK_STATUS_LIMIT
+
+
+def test_bulk_send_queues_more_than_default_queue_size():
+    app = make_app()
+    messages = [{'to': f'+9198765{number:05d}', 'message': 'Shortlisted'} for number in range(300)]
+    with app.app_context():
+        statuses = send_sms_batch(messages)
+    assert statuses == [SMS_QUEUED] * len(messages)